@@ -1,7 +1,7 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import cv2
-import numpy as np
+import math
 import base64
 from io import BytesIO
 from PIL import Image
@@ -13,14 +13,15 @@ class ToothMeasurement:
     def __init__(self, mm_per_pixel=0.15, magnification=1.25):
         self.mm_per_pixel = mm_per_pixel
         self.magnification = magnification
+        self._px_to_mm_scale = mm_per_pixel / magnification
     
     def calculate(self, points):
         """Calculate measurements from 4 points"""
-        pm_width_px = np.sqrt((points[1][0] - points[0][0])**2 + (points[1][1] - points[0][1])**2)
-        pr_width_px = np.sqrt((points[3][0] - points[2][0])**2 + (points[3][1] - points[2][1])**2)
+        pm_width_px = math.hypot(points[1][0] - points[0][0], points[1][1] - points[0][1])
+        pr_width_px = math.hypot(points[3][0] - points[2][0], points[3][1] - points[2][1])
         
-        pm_width_mm = (pm_width_px * self.mm_per_pixel) / self.magnification
-        pr_width_mm = (pr_width_px * self.mm_per_pixel) / self.magnification
+        pm_width_mm = pm_width_px * self._px_to_mm_scale
+        pr_width_mm = pr_width_px * self._px_to_mm_scale
         difference = pm_width_mm - pr_width_mm
         
         return {
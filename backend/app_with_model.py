@@ -1 +1,212 @@
-# See the complete file in the instructions below
\ No newline at end of file
+from flask import Flask, request, jsonify
+from flask_cors import CORS
+import cv2
+import numpy as np
+import base64
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from dental_width_analyzer import DentalWidthAnalyzer
+from batcher import MicroBatcher
+
+app = Flask(__name__)
+CORS(app)
+
+JPEG_QUALITY = 85
+
+# Largest radiograph accepted, whether uploaded directly or fetched by URL
+MAX_IMAGE_BYTES = int(os.environ.get('MAX_IMAGE_BYTES', 20 * 1024 * 1024))
+app.config['MAX_CONTENT_LENGTH'] = MAX_IMAGE_BYTES
+
+# libjpeg-turbo's SIMD codec is considerably faster than the libjpeg bundled
+# with most OpenCV wheels; fall back to OpenCV when it is not installed
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _tj = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    _tj = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Per-thread decode/encode buffers, reused while the image size is unchanged
+_buffers = threading.local()
+
+# Reuse keep-alive connections to the image host instead of paying a
+# TCP + TLS handshake for every request
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=1)
+_session.mount('https://', _adapter)
+_session.mount('http://', _adapter)
+
+# Finished response bodies keyed by image content hash; clinicians often
+# re-open the same radiograph while reviewing a case
+ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE', 64))
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+# Load the model once per process, not per request
+analyzer = DentalWidthAnalyzer(model_path=os.environ.get('MODEL_PATH', 'models/best.pt'))
+# Concurrent requests share batched forward passes
+batcher = MicroBatcher(analyzer)
+
+
+def fetch_image(image_url):
+    """Download image bytes over the pooled session, up to MAX_IMAGE_BYTES"""
+    data = bytearray()
+    with _session.get(image_url, stream=True, timeout=(3, 10)) as response:
+        response.raise_for_status()
+        if int(response.headers.get('Content-Length') or 0) > MAX_IMAGE_BYTES:
+            raise RequestEntityTooLarge()
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            data += chunk
+            if len(data) > MAX_IMAGE_BYTES:
+                raise RequestEntityTooLarge()
+    return data
+
+
+def decode_image(data):
+    """Decode uploaded image bytes into a BGR array"""
+    if _tj is not None and data[:2] == b'\xff\xd8':
+        width, height, _, _ = _tj.decode_header(data)
+        buf = getattr(_buffers, 'decode', None)
+        if buf is None or buf.shape != (height, width, 3):
+            buf = _buffers.decode = np.empty((height, width, 3), np.uint8)
+        return _tj.decode(data, pixel_format=TJPF_BGR, dst=buf)
+    
+    # PNG/TIFF uploads, or no libjpeg-turbo available
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def encode_jpeg(image):
+    """Encode an image as JPEG in memory, returning a bytes-like object"""
+    if _tj is not None:
+        size = _tj.buffer_size(image)
+        buf = getattr(_buffers, 'encode', None)
+        if buf is None or len(buf) < size:
+            buf = _buffers.encode = bytearray(size)
+        _, n_bytes = _tj.encode(image, quality=JPEG_QUALITY, dst=buf)
+        return memoryview(buf)[:n_bytes]
+    
+    ok, buf = cv2.imencode('.jpg', image, [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY])
+    if not ok:
+        raise ValueError('Could not encode annotated image')
+    return buf
+
+
+def dumps(obj):
+    """Serialize to JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+
+def report_body(report, annotated):
+    """JSON body for a report plus its annotated image
+    
+    Base64 output is plain ASCII and needs no JSON escaping, so the encoded
+    image bytes are spliced into the serialized report as they are instead
+    of being decoded to a str and re-encoded by the JSON encoder.
+    """
+    body = dumps(report)
+    image_b64 = base64.b64encode(encode_jpeg(annotated))
+    return b''.join((body[:-1], b',"annotated_image_base64":"', image_b64, b'"}'))
+
+
+def image_digest(data):
+    """Content hash used as the analysis cache key"""
+    if xxhash is not None:
+        return xxhash.xxh3_64_hexdigest(data)
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def cache_get(key):
+    with _cache_lock:
+        body = _cache.get(key)
+        if body is not None:
+            _cache.move_to_end(key)
+        return body
+
+
+def cache_put(key, body):
+    if ANALYSIS_CACHE_SIZE <= 0:
+        return
+    with _cache_lock:
+        _cache[key] = body
+        _cache.move_to_end(key)
+        while len(_cache) > ANALYSIS_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+@app.route('/health', methods=['GET'])
+def health():
+    return jsonify({'status': 'healthy', 'mode': 'model'})
+
+def analysis_response(image_bytes):
+    """Analyze image bytes, reusing the cached body for a repeated image"""
+    digest = image_digest(image_bytes)
+
+    body = cache_get(digest)
+    if body is None:
+        image = decode_image(image_bytes)
+        if image is None:
+            return jsonify({'error': 'Could not decode image'}), 400
+
+        report, annotated = analyzer.analyze_ndarray(image, detect=batcher.detect_teeth)
+        body = report_body(report, annotated)
+        cache_put(digest, body)
+
+    return app.response_class(body, mimetype='application/json')
+
+@app.route('/analyze', methods=['POST'])
+def analyze():
+    """Analyze an image fetched from image_url (deprecated, use /analyze_bytes)"""
+    try:
+        data = request.json
+        image_url = data.get('image_url')
+
+        if not image_url:
+            return jsonify({'error': 'image_url is required'}), 400
+
+        return analysis_response(fetch_image(image_url))
+
+    except RequestEntityTooLarge:
+        return jsonify({'error': f'Image exceeds {MAX_IMAGE_BYTES} bytes'}), 413
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/analyze_bytes', methods=['POST'])
+def analyze_bytes():
+    """Analyze an image sent as the raw request body or a multipart 'image' field"""
+    try:
+        if 'image' in request.files:
+            image_bytes = request.files['image'].stream.read()
+        else:
+            image_bytes = request.get_data(cache=False)
+
+        if not image_bytes:
+            return jsonify({'error': 'image bytes are required'}), 400
+
+        return analysis_response(image_bytes)
+
+    except RequestEntityTooLarge:
+        return jsonify({'error': f'Image exceeds {MAX_IMAGE_BYTES} bytes'}), 413
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 8000))
+    app.run(host='0.0.0.0', port=port)
@@ -0,0 +1,90 @@
+"""
+Micro-batching of YOLO inference across concurrent requests
+
+Request threads submit preprocessed images; a single worker thread
+collects whatever arrives within a short window and runs one batched
+``model.predict`` call, then hands each request its own detections.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout, wait
+
+import numpy as np
+
+from dental_width_analyzer import Detections
+
+
+class MicroBatcher:
+    def __init__(self, analyzer, max_batch: int = None, max_wait_ms: float = None):
+        """
+        Args:
+            analyzer: DentalWidthAnalyzer whose model runs the batches
+            max_batch: Largest batch sent to the model (env BATCH_MAX_SIZE)
+            max_wait_ms: How long to wait for a batch to fill (env BATCH_MAX_WAIT_MS)
+        """
+        self.analyzer = analyzer
+        self.max_batch = max_batch or int(os.environ.get('BATCH_MAX_SIZE', 8))
+        if max_wait_ms is None:
+            max_wait_ms = float(os.environ.get('BATCH_MAX_WAIT_MS', 8))
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='yolo-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, image: np.ndarray) -> Future:
+        """Queue an image for detection and return a future for its detections"""
+        future = Future()
+        self._queue.put((image, future))
+        return future
+
+    def detect_teeth(self, image: np.ndarray, timeout: float = 30) -> Detections:
+        """Drop-in replacement for DentalWidthAnalyzer.detect_teeth
+
+        ``image`` is not copied: on timeout this still waits for a batch that
+        already holds it, since the caller reuses the buffer once it returns.
+        """
+        future = self.submit(image)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            if not future.cancel():
+                wait([future])
+            raise
+
+    def _drain(self):
+        """Block for the first item, then collect more until full or timed out"""
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(items) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return items
+
+    def _run(self):
+        while True:
+            # Skip requests whose callers already gave up
+            items = [(image, future) for image, future in self._drain()
+                     if future.set_running_or_notify_cancel()]
+            if not items:
+                continue
+
+            try:
+                batch_detections = self.analyzer.detect_teeth_batch([image for image, _ in items])
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), detections in zip(items, batch_detections):
+                future.set_result(detections)
@@ -1,5 +1,5 @@
 import cv2
-import numpy as np
+import math
 
 class CalibratedToothSelector:
     def __init__(self, mm_per_pixel=0.15, magnification=1.25):
@@ -8,6 +8,7 @@ class CalibratedToothSelector:
         self.clone = None
         self.magnification = magnification
         self.mm_per_pixel = mm_per_pixel
+        self._px_to_mm_scale = mm_per_pixel / magnification
         
     def select_teeth(self, image_path):
         self.image = cv2.imread(image_path)
@@ -66,10 +67,10 @@ class CalibratedToothSelector:
             self.points.append((x, y))
     
     def _calculate_distance(self, pt1, pt2):
-        return np.sqrt((pt2[0] - pt1[0])**2 + (pt2[1] - pt1[1])**2)
+        return math.hypot(pt2[0] - pt1[0], pt2[1] - pt1[1])
     
     def _px_to_mm(self, pixels):
-        return (pixels * self.mm_per_pixel) / self.magnification
+        return pixels * self._px_to_mm_scale
     
     def _calculate_results(self):
         pm_width_mm = self._px_to_mm(self._calculate_distance(self.points[0], self.points[1]))
@@ -1,15 +1,111 @@
 import cv2
 import numpy as np
 from ultralytics import YOLO
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional, Callable, Iterable, Iterator
+from pathlib import Path
+from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
 import json
 
+DENOISE_MODES = ('none', 'bilateral', 'nlm', 'cuda_nlm', 'dncnn')
+
+PRIMARY_MOLAR_TERMS = ('primary', 'deciduous', 'e', 'j')
+PREMOLAR_TERMS = ('premolar', 'bicuspid')
+
+# Values of the per-class category lookup table
+CATEGORY_OTHER = -1
+CATEGORY_PRIMARY_MOLAR = 0
+CATEGORY_PREMOLAR = 1
+
+
+@dataclass
+class Detections:
+    """Detections for one image, stored column-wise"""
+    xyxy: np.ndarray        # (N, 4) pixel boxes, float32 until pixels()
+    conf: np.ndarray        # (N,) float32
+    cls: np.ndarray         # (N,) int32
+    class_name: List[str]
+    
+    def __len__(self) -> int:
+        return len(self.cls)
+    
+    def select(self, idx: np.ndarray) -> 'Detections':
+        """Subset by boolean mask or index array"""
+        idx = np.arange(len(self))[idx]
+        return Detections(self.xyxy[idx], self.conf[idx], self.cls[idx],
+                          [self.class_name[i] for i in idx])
+    
+    def scaled(self, factor: float) -> 'Detections':
+        """Same detections with box coordinates multiplied by ``factor``"""
+        xyxy = self.xyxy.astype(np.float32) * np.float32(factor)
+        return Detections(xyxy, self.conf, self.cls, self.class_name)
+    
+    def pixels(self) -> 'Detections':
+        """Same detections with boxes cast to int32 pixel coordinates"""
+        return Detections(self.xyxy.astype(np.int32), self.conf, self.cls, self.class_name)
+    
+    def to_dicts(self) -> List[Dict]:
+        """Per-detection dicts for JSON output"""
+        return [
+            {
+                'bbox': self.xyxy[i].tolist(),
+                'confidence': float(self.conf[i]),
+                'class_id': int(self.cls[i]),
+                'class_name': self.class_name[i]
+            }
+            for i in range(len(self))
+        ]
+
+
+
 class DentalWidthAnalyzer:
-    def __init__(self, model_path: str = 'models/best.pt'):
-        """Initialize the Dental Width Analyzer"""
+    def __init__(self, model_path: str = 'models/best.pt', denoise_mode: str = 'bilateral',
+                 denoise_model_path: Optional[str] = None, process_size: Optional[int] = 640):
+        """Initialize the Dental Width Analyzer
+        
+        ``denoise_model_path`` is an ONNX DnCNN/FFDNet-style denoiser used by
+        ``denoise_mode='dncnn'``; it takes and returns a 1x1xHxW image in [0, 1].
+        The analyze methods shrink images whose long edge exceeds
+        ``process_size`` to it before preprocessing and detection, and map the
+        boxes back to native pixels; ``None`` keeps the native resolution.
+        """
+        if denoise_mode not in DENOISE_MODES:
+            raise ValueError(f"denoise_mode must be one of {DENOISE_MODES}, got {denoise_mode!r}")
+        if denoise_mode == 'dncnn' and denoise_model_path is None:
+            raise ValueError("denoise_mode='dncnn' requires denoise_model_path")
+        
         self.model = YOLO(model_path)
+        if Path(model_path).suffix == '.pt':
+            # Exported ONNX/TensorRT models are already fused
+            self.model.fuse()
+        
+        self._category_lut = self._build_category_lut(self.model.names)
+        
+        # Pay the one-off lazy init cost at startup, not on the first request
+        self.model.predict(np.zeros((640, 640, 3), np.uint8), imgsz=640, verbose=False)
+        
         self.magnification_factor = 1.25
         self.mm_per_pixel = 0.12
+        # Both factors are fixed after construction; fold them into one multiplier
+        self._px_to_mm_scale = self.mm_per_pixel / self.magnification_factor
+        
+        # Non-local means is far too slow to run per request on the CPU;
+        # bilateral filtering is the default and NLM is kept for comparison
+        if denoise_mode == 'cuda_nlm' and cv2.cuda.getCudaEnabledDeviceCount() == 0:
+            denoise_mode = 'nlm'
+        self.denoise_mode = denoise_mode
+        # YOLO resizes to imgsz anyway; CLAHE and denoising need not see more
+        self.process_size = process_size
+        self._denoise_session = None
+        if denoise_mode == 'dncnn':
+            self._denoise_session = self._load_denoise_session(denoise_model_path)
+        
+        # Scratch buffers are per thread: the model API preprocesses
+        # concurrent requests on separate threads
+        self._buffers = threading.local()
         
         self.colors = {
             'primary_molar': (255, 0, 0),
@@ -18,193 +114,342 @@ class DentalWidthAnalyzer:
             'text_bg': (200, 200, 200)
         }
     
+    def _buffer(self, name: str, shape: Tuple[int, ...]) -> np.ndarray:
+        """Per-thread uint8 scratch buffer, reallocated only when the shape changes"""
+        buf = getattr(self._buffers, name, None)
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, np.uint8)
+            setattr(self._buffers, name, buf)
+        return buf
+    
     def preprocess_image(self, image_path: str) -> np.ndarray:
-        """Enhanced preprocessing for panoramic radiographs"""
-        img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        """Enhanced preprocessing for panoramic radiographs
         
+        Runs at native resolution, so detections on the result can go
+        straight to ``measure_width``. The returned array is reused by the
+        next call on the same thread.
+        """
+        img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        return self._preprocess_from_gray(img)
+    
+    def _downscale(self, img: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Shrink to ``process_size`` on the long edge, returning the scale used"""
+        if self.process_size is None or max(img.shape[:2]) <= self.process_size:
+            return img, 1.0
+        scale = self.process_size / max(img.shape[:2])
+        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return img, scale
+    
+    def _prepare(self, image: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Preprocessed model input for a BGR image and its scale to native pixels"""
+        gray, scale = self._downscale(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
+        return self._preprocess_from_gray(gray), scale
+    
+    def _preprocess_from_gray(self, img: np.ndarray) -> np.ndarray:
+        """CLAHE, denoise and normalize an already decoded grayscale image"""
         clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
         enhanced = clahe.apply(img)
         
-        denoised = cv2.fastNlMeansDenoising(enhanced, None, h=10, 
-                                            templateWindowSize=7, 
-                                            searchWindowSize=21)
+        denoised = self._denoise(enhanced)
+        
+        # CLAHE output almost always spans 0-255 already; only stretch, in
+        # place, when it does not
+        min_val, max_val, _, _ = cv2.minMaxLoc(denoised)
+        if min_val > 0 or max_val < 255:
+            cv2.normalize(denoised, denoised, 0, 255, cv2.NORM_MINMAX)
         
-        normalized = cv2.normalize(denoised, None, 0, 255, cv2.NORM_MINMAX)
-        rgb_image = cv2.cvtColor(normalized, cv2.COLOR_GRAY2RGB)
+        # YOLO expects three channels; write them into a reused buffer
+        rgb_image = self._buffer('rgb', denoised.shape + (3,))
+        cv2.cvtColor(denoised, cv2.COLOR_GRAY2RGB, dst=rgb_image)
         
         return rgb_image
     
-    def detect_teeth(self, image: np.ndarray, conf_threshold: float = 0.25) -> List[Dict]:
+    @staticmethod
+    def _load_denoise_session(model_path: str):
+        """ONNX Runtime session for the learned denoiser, on the GPU when possible"""
+        import onnxruntime as ort
+        
+        preferred = ['TensorrtExecutionProvider', 'CUDAExecutionProvider', 'CPUExecutionProvider']
+        available = ort.get_available_providers()
+        providers = [p for p in preferred if p in available]
+        return ort.InferenceSession(model_path, providers=providers)
+    
+    def _denoise(self, enhanced: np.ndarray) -> np.ndarray:
+        """Denoise the CLAHE output according to ``self.denoise_mode``"""
+        if self.denoise_mode == 'none':
+            return enhanced
+        
+        if self.denoise_mode == 'dncnn':
+            model_input = self._denoise_session.get_inputs()[0]
+            dtype = np.float16 if model_input.type == 'tensor(float16)' else np.float32
+            x = (enhanced.astype(dtype) * dtype(1 / 255))[None, None]
+            y = self._denoise_session.run(None, {model_input.name: x})[0]
+            return np.clip(y[0, 0] * 255, 0, 255).astype(np.uint8)
+        
+        if self.denoise_mode == 'cuda_nlm':
+            if getattr(self._buffers, 'gpu_src', None) is None:
+                self._buffers.gpu_src = cv2.cuda_GpuMat()
+                self._buffers.gpu_dst = cv2.cuda_GpuMat()
+            gpu_src, gpu_dst = self._buffers.gpu_src, self._buffers.gpu_dst
+            gpu_src.upload(enhanced)
+            cv2.cuda.fastNlMeansDenoising(gpu_src, 10, dst=gpu_dst,
+                                          search_window=21, block_size=7)
+            return gpu_dst.download()
+        
+        if self.denoise_mode == 'nlm':
+            return cv2.fastNlMeansDenoising(enhanced, None, h=10, 
+                                            templateWindowSize=7, 
+                                            searchWindowSize=21)
+        
+        return cv2.bilateralFilter(enhanced, d=7, sigmaColor=25, sigmaSpace=25,
+                                   dst=self._buffer('denoised', enhanced.shape))
+    
+    def detect_teeth(self, image: np.ndarray, conf_threshold: float = 0.25) -> Detections:
         """Detect teeth in the image"""
+        return self.detect_teeth_batch([image], conf_threshold)[0]
+    
+    def detect_teeth_batch(self, images: List[np.ndarray],
+                           conf_threshold: float = 0.25) -> List[Detections]:
+        """Detect teeth in several images with a single batched forward pass"""
         results = self.model.predict(
-            image,
+            images,
             conf=conf_threshold,
             iou=0.45,
             imgsz=640,
             verbose=False
         )
         
-        detections = []
+        batch_detections = []
         for r in results:
+            # One device-to-host copy per column instead of three per box
             boxes = r.boxes
-            for box in boxes:
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                conf = float(box.conf[0].cpu().numpy())
-                cls = int(box.cls[0].cpu().numpy())
-                class_name = self.model.names[cls]
-                
-                detections.append({
-                    'bbox': [int(x1), int(y1), int(x2), int(y2)],
-                    'confidence': conf,
-                    'class_id': cls,
-                    'class_name': class_name
-                })
-        
-        return detections
-    
-    def measure_width(self, bbox: List[int]) -> float:
-        """Calculate mesiodistal width with magnification correction"""
-        x1, y1, x2, y2 = bbox
-        pixel_width = x2 - x1
-        width_mm = (pixel_width * self.mm_per_pixel) / self.magnification_factor
+            # Kept in float: callers that rescale cast to pixels afterwards
+            xyxy = boxes.xyxy.cpu().numpy().astype(np.float32, copy=False)
+            conf = boxes.conf.cpu().numpy()
+            cls = boxes.cls.cpu().numpy().astype(np.int32)
+            
+            batch_detections.append(Detections(
+                xyxy=xyxy,
+                conf=conf,
+                cls=cls,
+                class_name=[self.model.names[c] for c in cls.tolist()]
+            ))
+        
+        return batch_detections
+    
+    def measure_width(self, bbox: np.ndarray) -> np.ndarray:
+        """Calculate mesiodistal width with magnification correction
+        
+        Accepts a single (4,) box or an (N, 4) array of boxes.
+        """
+        bbox = np.asarray(bbox)
+        pixel_width = bbox[..., 2] - bbox[..., 0]
+        width_mm = pixel_width * self._px_to_mm_scale
         return width_mm
     
-    def categorize_teeth(self, detections: List[Dict]) -> Dict:
+    @staticmethod
+    def _build_category_lut(names: Dict[int, str]) -> np.ndarray:
+        """Map each model class id to a tooth category once, at load time"""
+        lut = np.full(max(names) + 1, CATEGORY_OTHER, dtype=np.int8)
+        for cls_id, name in names.items():
+            name = name.lower()
+            if any(term in name for term in PRIMARY_MOLAR_TERMS):
+                lut[cls_id] = CATEGORY_PRIMARY_MOLAR
+            elif any(term in name for term in PREMOLAR_TERMS):
+                lut[cls_id] = CATEGORY_PREMOLAR
+        return lut
+    
+    def categorize_teeth(self, detections: Detections) -> Dict[str, Detections]:
         """Separate primary molars and premolars"""
-        categories = {
-            'primary_molars': [],
-            'premolars': []
+        categories = self._category_lut[detections.cls]
+        
+        return {
+            'primary_molars': detections.select(categories == CATEGORY_PRIMARY_MOLAR),
+            'premolars': detections.select(categories == CATEGORY_PREMOLAR)
         }
+    
+    def match_pairs(self, primary_molars: Detections,
+                    premolars: Detections) -> Tuple[np.ndarray, np.ndarray]:
+        """Match primary molars with their corresponding premolars
         
-        for det in detections:
-            if any(term in det['class_name'].lower() for term in ['primary', 'deciduous', 'e', 'j']):
-                categories['primary_molars'].append(det)
-            elif any(term in det['class_name'].lower() for term in ['premolar', 'bicuspid']):
-                categories['premolars'].append(det)
+        Returns index arrays into ``primary_molars`` and ``premolars``.
+        """
+        if not len(primary_molars) or not len(premolars):
+            empty = np.empty(0, dtype=np.intp)
+            return empty, empty
         
-        return categories
-    
-    def match_pairs(self, primary_molars: List[Dict], premolars: List[Dict]) -> List[Tuple]:
-        """Match primary molars with their corresponding premolars"""
-        pairs = []
+        pm_boxes = primary_molars.xyxy.astype(np.float32)
+        pr_boxes = premolars.xyxy.astype(np.float32)
+        pm_centers = (pm_boxes[:, :2] + pm_boxes[:, 2:]) * 0.5
+        pr_centers = (pr_boxes[:, :2] + pr_boxes[:, 2:]) * 0.5
         
-        for pm in primary_molars:
-            pm_center_x = (pm['bbox'][0] + pm['bbox'][2]) / 2
-            pm_center_y = (pm['bbox'][1] + pm['bbox'][3]) / 2
-            
-            min_dist = float('inf')
-            best_match = None
-            
-            for pr in premolars:
-                pr_center_x = (pr['bbox'][0] + pr['bbox'][2]) / 2
-                pr_center_y = (pr['bbox'][1] + pr['bbox'][3]) / 2
-                
-                dist = np.sqrt((pm_center_x - pr_center_x)**2 + 
-                             (pm_center_y - pr_center_y)**2)
-                
-                if dist < min_dist:
-                    min_dist = dist
-                    best_match = pr
-            
-            if best_match:
-                pairs.append((pm, best_match))
+        # Squared distances are enough to find the nearest premolar
+        deltas = pm_centers[:, None, :] - pr_centers[None, :, :]
+        nearest = (deltas * deltas).sum(axis=2).argmin(axis=1)
         
-        return pairs
+        return np.arange(len(primary_molars)), nearest
     
     def draw_annotations(self, image: np.ndarray, pair: Tuple, difference: float) -> np.ndarray:
-        """Draw annotations like the example image"""
-        annotated = image.copy()
-        primary_molar, premolar = pair
-        
-        pm_bbox = primary_molar['bbox']
-        cv2.rectangle(annotated, 
-                     (pm_bbox[0], pm_bbox[1]), 
-                     (pm_bbox[2], pm_bbox[3]), 
-                     self.colors['primary_molar'], 3)
-        
-        pr_bbox = premolar['bbox']
-        cv2.rectangle(annotated, 
-                     (pr_bbox[0], pr_bbox[1]), 
-                     (pr_bbox[2], pr_bbox[3]), 
-                     self.colors['premolar'], 3)
-        
-        pm_center_y = (pm_bbox[1] + pm_bbox[3]) // 2
-        pm_center_x = (pm_bbox[0] + pm_bbox[2]) // 2
-        cv2.circle(annotated, (pm_center_x, pm_center_y + 100), 40, 
-                  self.colors['measurement_line'], 3)
-        
-        pr_center_y = (pr_bbox[1] + pr_bbox[3]) // 2
-        pr_center_x = (pr_bbox[0] + pr_bbox[2]) // 2
-        cv2.circle(annotated, (pr_center_x, pr_center_y + 100), 40, 
-                  self.colors['measurement_line'], 3)
-        
-        line_y = min(pm_bbox[1], pr_bbox[1]) + 50
-        cv2.line(annotated, 
-                (pm_center_x, line_y), 
-                (pr_center_x, line_y), 
-                self.colors['measurement_line'], 2)
-        
-        mid_x = (pm_center_x + pr_center_x) // 2
-        text = f"Delta {difference:.2f}mm"
-        
-        (text_w, text_h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)
-        cv2.rectangle(annotated, 
-                     (mid_x - text_w//2 - 10, line_y - text_h - 20),
-                     (mid_x + text_w//2 + 10, line_y - 5),
-                     self.colors['text_bg'], -1)
-        
-        cv2.putText(annotated, text, 
-                   (mid_x - text_w//2, line_y - 10),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, 
-                   self.colors['measurement_line'], 2)
-        
-        return annotated
+        """Draw annotations like the example image, in place
+        
+        ``pair`` holds the primary molar and premolar boxes as [x1, y1, x2, y2].
+        """
+        pm_bbox, pr_bbox = pair
+        return self.draw_all(image, np.array([pm_bbox]), np.array([pr_bbox]), [difference])
+    
+    def draw_all(self, image: np.ndarray, pm_boxes: np.ndarray, pr_boxes: np.ndarray,
+                 differences) -> np.ndarray:
+        """Draw the annotations for every pair in place
+        
+        Overlay geometry for all pairs is computed up front with NumPy; boxes
+        and measurement lines then go to OpenCV in one ``cv2.polylines`` call
+        each, and labels are drawn last so later pairs never cover them.
+        """
+        if len(differences) == 0:
+            return image
+        
+        pm_boxes = np.asarray(pm_boxes, dtype=np.int32)
+        pr_boxes = np.asarray(pr_boxes, dtype=np.int32)
+        line_color = self.colors['measurement_line']
+        
+        for boxes, color in ((pm_boxes, self.colors['primary_molar']),
+                             (pr_boxes, self.colors['premolar'])):
+            x1, y1, x2, y2 = boxes.T
+            corners = np.stack([x1, y1, x2, y1, x2, y2, x1, y2], axis=1).reshape(-1, 4, 2)
+            cv2.polylines(image, corners, True, color, 3)
+        
+        pm_centers = (pm_boxes[:, :2] + pm_boxes[:, 2:]) // 2
+        pr_centers = (pr_boxes[:, :2] + pr_boxes[:, 2:]) // 2
+        for cx, cy in np.concatenate([pm_centers, pr_centers]).tolist():
+            cv2.circle(image, (cx, cy + 100), 40, line_color, 3)
+        
+        line_y = np.minimum(pm_boxes[:, 1], pr_boxes[:, 1]) + 50
+        lines = np.stack([pm_centers[:, 0], line_y, pr_centers[:, 0], line_y], axis=1)
+        cv2.polylines(image, lines.reshape(-1, 2, 2), False, line_color, 2)
+        
+        mid_x = (pm_centers[:, 0] + pr_centers[:, 0]) // 2
+        for x, y, difference in zip(mid_x.tolist(), line_y.tolist(), differences):
+            text = f"Delta {difference:.2f}mm"
+            (text_w, text_h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)
+            cv2.rectangle(image, 
+                         (x - text_w//2 - 10, y - text_h - 20),
+                         (x + text_w//2 + 10, y - 5),
+                         self.colors['text_bg'], -1)
+            cv2.putText(image, text, 
+                       (x - text_w//2, y - 10),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, 
+                       line_color, 2)
+        
+        return image
     
     def analyze(self, image_path: str, output_path: str = 'result.jpg') -> Dict:
         """Complete analysis pipeline"""
-        processed_image = self.preprocess_image(image_path)
-        original_image = cv2.imread(image_path)
+        # Decode once; the grayscale input is derived from the colour image
+        original_image = cv2.imread(image_path, cv2.IMREAD_COLOR)
+        if original_image is None:
+            raise FileNotFoundError(f"Could not read image: {image_path}")
+        
+        report, annotated_image = self.analyze_ndarray(original_image)
+        cv2.imwrite(output_path, annotated_image)
+        
+        report['output_image'] = output_path
+        return report
+    
+    def analyze_ndarray(self, image: np.ndarray,
+                        detect: Optional[Callable] = None) -> Tuple[Dict, np.ndarray]:
+        """Analyze an already decoded BGR image without touching the disk
         
-        detections = self.detect_teeth(processed_image)
+        Returns the report and the annotated image so callers can encode it
+        in memory instead of writing and re-reading a file. ``detect`` can
+        replace ``self.detect_teeth``, e.g. with ``MicroBatcher.detect_teeth``.
+        """
+        processed_image, scale = self._prepare(image)
+        return self._analyze(processed_image, image, detect, scale)
+    
+    def analyze_many(self, images: Iterable[np.ndarray],
+                     workers: Optional[int] = None) -> Iterator[Tuple[Dict, np.ndarray]]:
+        """Analyze a stream of BGR images, overlapping preprocessing with inference
+        
+        CLAHE and denoising run on a thread pool a few images ahead while the
+        calling thread runs detection and annotation, so the model is not idle
+        waiting on the CPU stage. Results are yielded in input order; as with
+        ``analyze_ndarray`` the annotated image is reused for the next result.
+        """
+        workers = workers or os.cpu_count() or 1
+        
+        def preprocess(image):
+            # Copy out of the worker's reusable buffer: the result waits in
+            # the queue while the same worker moves on to the next image
+            processed_image, scale = self._prepare(image)
+            return processed_image.copy(), scale
+        
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for image in images:
+                pending.append((pool.submit(preprocess, image), image))
+                if len(pending) > 2 * workers:
+                    future, original = pending.popleft()
+                    processed_image, scale = future.result()
+                    yield self._analyze(processed_image, original, scale=scale)
+            
+            while pending:
+                future, original = pending.popleft()
+                processed_image, scale = future.result()
+                yield self._analyze(processed_image, original, scale=scale)
+    
+    def _analyze(self, processed_image: np.ndarray, original_image: np.ndarray,
+                 detect: Optional[Callable] = None,
+                 scale: float = 1.0) -> Tuple[Dict, np.ndarray]:
+        """Detect, pair, measure and annotate
+        
+        ``scale`` is the size of ``processed_image`` relative to
+        ``original_image``; boxes are mapped back to native pixels so widths
+        stay in the calibrated ``mm_per_pixel`` units. The annotated image is
+        reused by the next call on the same thread.
+        """
+        detections = (detect or self.detect_teeth)(processed_image)
+        if scale != 1.0:
+            detections = detections.scaled(1.0 / scale)
+        # Cast once, at native resolution, so downscaling does not quantize widths
+        detections = detections.pixels()
         categories = self.categorize_teeth(detections)
-        pairs = self.match_pairs(
-            categories['primary_molars'],
-            categories['premolars']
-        )
+        primary_molars = categories['primary_molars']
+        premolars = categories['premolars']
+        pm_idx, pr_idx = self.match_pairs(primary_molars, premolars)
+        
+        # Geometry for every pair in one pass; dicts only for the JSON output
+        pm_boxes = primary_molars.xyxy[pm_idx]
+        pr_boxes = premolars.xyxy[pr_idx]
+        pm_widths = self.measure_width(pm_boxes)
+        pr_widths = self.measure_width(pr_boxes)
+        differences = pm_widths - pr_widths
+        
+        annotated_image = self._buffer('annotated', original_image.shape)
+        np.copyto(annotated_image, original_image)
+        self.draw_all(annotated_image, pm_boxes, pr_boxes, differences.tolist())
         
         results = []
-        annotated_image = original_image.copy()
         
-        for primary_molar, premolar in pairs:
-            pm_width = self.measure_width(primary_molar['bbox'])
-            pr_width = self.measure_width(premolar['bbox'])
-            difference = pm_width - pr_width
-            
-            annotated_image = self.draw_annotations(
-                annotated_image,
-                (primary_molar, premolar),
-                difference
-            )
+        for k, (i, j) in enumerate(zip(pm_idx.tolist(), pr_idx.tolist())):
+            difference = float(differences[k])
             
             results.append({
                 'primary_molar': {
-                    'class': primary_molar['class_name'],
-                    'width_mm': round(pm_width, 2),
-                    'confidence': round(primary_molar['confidence'], 2)
+                    'class': primary_molars.class_name[i],
+                    'width_mm': round(float(pm_widths[k]), 2),
+                    'confidence': round(float(primary_molars.conf[i]), 2)
                 },
                 'premolar': {
-                    'class': premolar['class_name'],
-                    'width_mm': round(pr_width, 2),
-                    'confidence': round(premolar['confidence'], 2)
+                    'class': premolars.class_name[j],
+                    'width_mm': round(float(pr_widths[k]), 2),
+                    'confidence': round(float(premolars.conf[j]), 2)
                 },
                 'difference_mm': round(difference, 2),
                 'within_normal_range': 2.0 <= difference <= 2.8
             })
         
-        cv2.imwrite(output_path, annotated_image)
-        
-        return {
+        report = {
             'results': results,
-            'output_image': output_path,
             'total_pairs_detected': len(results)
         }
+        return report, annotated_image
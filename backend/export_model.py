@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Export the trained detector for faster inference in DentalWidthAnalyzer
+
+Examples:
+  python export_model.py                                   # models/best.onnx, FP16
+  python export_model.py --format engine                   # TensorRT on CUDA hosts
+  python export_model.py --int8 --data dataset/data.yaml   # INT8 for VNNI CPUs
+"""
+
+import argparse
+from ultralytics import YOLO
+
+
+def export_model(model_path, fmt='onnx', half=True, int8=False, data=None, imgsz=640):
+    """Export a YOLO .pt checkpoint and return the exported file path"""
+    model = YOLO(model_path)
+
+    export_args = {
+        'format': fmt,
+        'imgsz': imgsz,
+        'dynamic': False,
+        'half': half and not int8,
+    }
+
+    if int8:
+        # INT8 static quantization needs calibration images
+        if data is None:
+            raise ValueError('--int8 requires --data for calibration')
+        export_args['int8'] = True
+        export_args['data'] = data
+
+    return model.export(**export_args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export dental detector for inference')
+    parser.add_argument('--model', default='models/best.pt', help='Path to trained .pt model')
+    parser.add_argument('--format', default='onnx', choices=['onnx', 'engine', 'openvino'],
+                        help='Export format')
+    parser.add_argument('--no-half', action='store_true', help='Export in FP32')
+    parser.add_argument('--int8', action='store_true', help='INT8 static quantization')
+    parser.add_argument('--data', help='Dataset yaml used for INT8 calibration')
+    parser.add_argument('--imgsz', type=int, default=640, help='Inference image size')
+    args = parser.parse_args()
+
+    exported = export_model(
+        args.model,
+        fmt=args.format,
+        half=not args.no_half,
+        int8=args.int8,
+        data=args.data,
+        imgsz=args.imgsz
+    )
+
+    print(f"Exported model: {exported}")
+    print(f"Use it with: DentalWidthAnalyzer(model_path='{exported}')")
+
+
+if __name__ == '__main__':
+    main()
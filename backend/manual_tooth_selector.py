@@ -1,5 +1,5 @@
 import cv2
-import numpy as np
+import math
 
 class ManualToothSelector:
     def __init__(self):
@@ -8,6 +8,7 @@ class ManualToothSelector:
         self.clone = None
         self.magnification = 1.25
         self.mm_per_pixel = 0.2  # Increased from 0.12
+        self._px_to_mm_scale = self.mm_per_pixel / self.magnification
         
     def select_teeth(self, image_path):
         self.image = cv2.imread(image_path)
@@ -61,14 +62,14 @@ class ManualToothSelector:
             self.points.append((x, y))
     
     def _calculate_distance(self, pt1, pt2):
-        return np.sqrt((pt2[0] - pt1[0])**2 + (pt2[1] - pt1[1])**2)
+        return math.hypot(pt2[0] - pt1[0], pt2[1] - pt1[1])
     
     def _calculate_results(self):
         pm_width_px = self._calculate_distance(self.points[0], self.points[1])
         pr_width_px = self._calculate_distance(self.points[2], self.points[3])
         
-        pm_width_mm = (pm_width_px * self.mm_per_pixel) / self.magnification
-        pr_width_mm = (pr_width_px * self.mm_per_pixel) / self.magnification
+        pm_width_mm = pm_width_px * self._px_to_mm_scale
+        pr_width_mm = pr_width_px * self._px_to_mm_scale
         difference = pm_width_mm - pr_width_mm
         
         return {
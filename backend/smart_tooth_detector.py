@@ -7,10 +7,59 @@ import cv2
 import numpy as np
 from typing import List, Dict, Tuple, Optional
 import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+try:
+    from numba import njit
+except ImportError:
+    # Plain NumPy still vectorizes the kernels below, just without JIT
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Tooth regions are stored column-wise, one record per region
+REGION_DTYPE = np.dtype([
+    ('x0', 'i4'), ('y0', 'i4'), ('x1', 'i4'), ('y1', 'i4'),
+    ('w', 'i4'), ('h', 'i4'), ('cx', 'i4'), ('cy', 'i4'),
+    ('area', 'f4'), ('type', 'u1'),
+])
+
+# Values of the region ``type`` column
+TYPE_UNCLASSIFIED = 0
+TYPE_PRIMARY_MOLAR = 1
+TYPE_PREMOLAR = 2
+TYPE_UNCERTAIN = 3
+TYPE_NAMES = {
+    TYPE_PRIMARY_MOLAR: 'primary_molar',
+    TYPE_PREMOLAR: 'premolar',
+    TYPE_UNCERTAIN: 'uncertain',
+}
+
+
+@njit(cache=True)
+def _region_mask(rects, areas, min_area, max_area):
+    """Area and aspect-ratio filter over (N, 4) x, y, w, h bounding rects"""
+    widths = rects[:, 2]
+    heights = rects[:, 3]
+    # 0.4 < w / h < 2.5 in exact integer arithmetic (also rejects h == 0)
+    return ((areas > min_area) & (areas < max_area) &
+            (5 * widths > 2 * heights) & (2 * widths < 5 * heights))
+
+
+def _init_worker():
+    """Each worker process handles one image at a time; one OpenCV thread avoids oversubscription"""
+    cv2.setNumThreads(1)
+
 
 class SmartToothDetector:
     """
@@ -20,9 +69,27 @@ class SmartToothDetector:
     3. Region-based analysis for molar/premolar identification
     """
     
-    def __init__(self):
+    def __init__(self, high_quality: bool = False, use_cuda: Optional[bool] = None,
+                 coarse_levels: int = 0):
+        """
+        Args:
+            high_quality: Denoise with non-local means instead of the much
+                faster bilateral filter (offline use only)
+            use_cuda: Run preprocessing and edge extraction with OpenCV's CUDA
+                module; defaults to whether a CUDA device is available
+            coarse_levels: Find candidate regions on an image pyrDown-ed this
+                many times, then refine each one at full resolution inside
+                its own ROI; 0 processes the whole image at full resolution
+        """
+        self.high_quality = high_quality
+        if use_cuda is None:
+            use_cuda = cv2.cuda.getCudaEnabledDeviceCount() > 0
+        self.use_cuda = use_cuda
+        self.coarse_levels = coarse_levels
+        
         self.mm_per_pixel = 0.15
         self.magnification = 1.25
+        self._px_to_mm_scale = self.mm_per_pixel / self.magnification
         
         # Tooth identification thresholds
         self.min_tooth_area = 1000  # pixels
@@ -31,206 +98,398 @@ class SmartToothDetector:
         # Clinical knowledge: primary molars are wider than premolars
         self.width_ratio_threshold = 1.2
         
+        # Molar-premolar pairs must have centers closer than this (pixels);
+        # matching compares squared distances against the squared value
+        self.max_pair_distance = 300
+        
+        # Ping-pong preprocessing buffers, per thread for server use
+        self._buffers = threading.local()
+        
+        self._dilate_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+    
+    def __getstate__(self):
+        # Thread-local scratch state cannot be pickled; workers start fresh
+        state = self.__dict__.copy()
+        del state['_buffers']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._buffers = threading.local()
+    
+    def _buffer(self, name: str, shape: Tuple[int, ...]) -> np.ndarray:
+        """Per-thread uint8 scratch buffer, reallocated only when the shape changes"""
+        buf = getattr(self._buffers, name, None)
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, np.uint8)
+            setattr(self._buffers, name, buf)
+        return buf
+    
+    def _clahe(self):
+        """CLAHE object, built once per thread (it keeps internal state between calls)"""
+        clahe = getattr(self._buffers, 'clahe', None)
+        if clahe is None:
+            clahe = self._buffers.clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+        return clahe
+    
     def preprocess_xray(self, image: np.ndarray) -> np.ndarray:
-        """Enhanced preprocessing for panoramic X-rays"""
-        # Convert to grayscale if needed
+        """Enhanced preprocessing for panoramic X-rays
+        
+        Works in two reused buffers instead of allocating an image per step;
+        the returned array is overwritten by the next call on the same thread.
+        """
+        shape = image.shape[:2]
+        buf_a = self._buffer('a', shape)
+        buf_b = self._buffer('b', shape)
+        
+        # Convert to grayscale if needed; grayscale input is only read
         if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=buf_a)
         else:
-            gray = image.copy()
+            gray = image
         
         # Contrast enhancement
-        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-        enhanced = clahe.apply(gray)
-        
-        # Noise reduction
-        denoised = cv2.fastNlMeansDenoising(enhanced, None, h=10, 
-                                            templateWindowSize=7, 
-                                            searchWindowSize=21)
+        enhanced = self._clahe().apply(gray, dst=buf_b)
+        
+        # Noise reduction; an edge-preserving 5x5 bilateral filter is enough
+        # for Canny and is orders of magnitude cheaper than non-local means
+        if self.high_quality:
+            denoised = cv2.fastNlMeansDenoising(enhanced, buf_a, h=10, 
+                                                templateWindowSize=7, 
+                                                searchWindowSize=21)
+        else:
+            denoised = cv2.bilateralFilter(enhanced, 5, 40, 10, dst=buf_a)
         
-        # Normalize
-        normalized = cv2.normalize(denoised, None, 0, 255, cv2.NORM_MINMAX)
+        # Normalize in place
+        cv2.normalize(denoised, denoised, 0, 255, cv2.NORM_MINMAX)
         
-        return normalized
+        return denoised
     
-    def detect_tooth_regions(self, image: np.ndarray) -> List[Dict]:
+    def detect_tooth_regions(self, image: np.ndarray) -> np.recarray:
         """
         Detect potential tooth regions using edge detection and contours
+        
+        Returns a record array with REGION_DTYPE fields, one row per region.
         """
-        # Preprocess
+        if self.coarse_levels > 0:
+            return self._detect_coarse_to_fine(image)
+        return self._regions_from_edges(self._edges(image), self.min_tooth_area,
+                                        self.max_tooth_area)
+    
+    def _edges(self, image: np.ndarray) -> np.ndarray:
+        if self.use_cuda:
+            return self._edge_map_cuda(image)
+        return self._edge_map(image)
+    
+    def _regions_from_edges(self, closed: np.ndarray, min_area: float,
+                            max_area: float) -> np.recarray:
+        """Solid regions enclosed by the outlines in a binary edge map"""
+        # Fill everything enclosed by an outline: flood the outside from a
+        # padded corner, so each solid component is what an external
+        # contour would have enclosed
+        padded = cv2.copyMakeBorder(closed, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+        cv2.floodFill(padded, None, (0, 0), 128)
+        solid = np.not_equal(padded[1:-1, 1:-1], 128).view(np.uint8)
+        
+        # Bounding boxes and areas of all regions in one C call
+        _, _, stats, _ = cv2.connectedComponentsWithStatsWithAlgorithm(
+            solid, 8, cv2.CV_32S, cv2.CCL_BBDT)
+        rects = np.ascontiguousarray(stats[1:, :4])  # label 0 is the background
+        areas = stats[1:, cv2.CC_STAT_AREA].astype(np.float64)
+        # Teeth in panoramic X-rays typically have aspect ratio between 0.5 and 2.0
+        keep = np.flatnonzero(_region_mask(rects, areas, min_area, max_area))
+        
+        rects = rects[keep]
+        x, y, w, h = rects.T
+        tooth_regions = np.zeros(len(keep), dtype=REGION_DTYPE).view(np.recarray)
+        tooth_regions.x0, tooth_regions.y0 = x, y
+        tooth_regions.x1, tooth_regions.y1 = x + w, y + h
+        tooth_regions.w, tooth_regions.h = w, h
+        tooth_regions.cx, tooth_regions.cy = x + w // 2, y + h // 2
+        tooth_regions.area = areas[keep]
+        
+        return tooth_regions
+    
+    def _detect_coarse_to_fine(self, image: np.ndarray) -> np.recarray:
+        """Locate regions on a downsampled pyramid level, then refine in full-res ROIs"""
+        small = image
+        for _ in range(self.coarse_levels):
+            small = cv2.pyrDown(small)
+        scale = 2 ** self.coarse_levels
+        
+        coarse = self._regions_from_edges(self._edges(small),
+                                          self.min_tooth_area / scale ** 2,
+                                          self.max_tooth_area / scale ** 2)
+        
+        height, width = image.shape[:2]
+        pad = 2 * scale  # pyramid blur can pull edges inward by about this much
+        refined = []
+        for region in coarse:
+            # Coarse box at full resolution, in image coordinates
+            bx0, by0 = int(region.x0) * scale, int(region.y0) * scale
+            bx1, by1 = int(region.x1) * scale, int(region.y1) * scale
+            x0, y0 = max(bx0 - pad, 0), max(by0 - pad, 0)
+            x1, y1 = min(bx1 + pad, width), min(by1 + pad, height)
+            
+            roi_regions = self._regions_from_edges(self._edges(image[y0:y1, x0:x1]),
+                                                   self.min_tooth_area, self.max_tooth_area)
+            # The tooth is the ROI region containing the coarse box centre
+            # that overlaps the box best; a larger neighbour that also fits
+            # in the padded ROI does not contain that centre
+            cx, cy = (bx0 + bx1) / 2 - x0, (by0 + by1) / 2 - y0
+            contains = ((roi_regions.x0 <= cx) & (cx < roi_regions.x1) &
+                        (roi_regions.y0 <= cy) & (cy < roi_regions.y1))
+            if contains.any():
+                ix = (np.minimum(roi_regions.x1, bx1 - x0) -
+                      np.maximum(roi_regions.x0, bx0 - x0)).clip(0)
+                iy = (np.minimum(roi_regions.y1, by1 - y0) -
+                      np.maximum(roi_regions.y0, by0 - y0)).clip(0)
+                inter = ix.astype(np.float64) * iy
+                union = (roi_regions.w.astype(np.float64) * roi_regions.h +
+                         (bx1 - bx0) * (by1 - by0) - inter)
+                iou = np.where(contains, inter / union, -1.0)
+                # Shift the chosen region back to image coordinates
+                best = roi_regions[np.argmax(iou)].copy()
+                best.x0 += x0
+                best.x1 += x0
+                best.cx += x0
+                best.y0 += y0
+                best.y1 += y0
+                best.cy += y0
+            else:
+                # No full-resolution region at the box centre: keep the upscaled coarse box
+                best = region.copy()
+                for field in ('x0', 'y0', 'x1', 'y1', 'w', 'h', 'cx', 'cy'):
+                    best[field] *= scale
+                best.area *= scale ** 2
+            refined.append(best)
+        
+        refined = np.array(refined, dtype=REGION_DTYPE)
+        # Neighbouring coarse boxes can refine to the same region: keep one
+        _, first = np.unique(refined[['x0', 'y0', 'x1', 'y1']], return_index=True)
+        return refined[np.sort(first)].view(np.recarray)
+    
+    def _edge_map(self, image: np.ndarray) -> np.ndarray:
+        """Binary tooth-outline map used for contour extraction"""
         processed = self.preprocess_xray(image)
         
-        # Edge detection
-        edges = cv2.Canny(processed, 50, 150)
+        # Edge detection: separable Sobel L1 gradient magnitude (as Canny
+        # uses) thresholded at Canny's strong-edge level. Region extraction
+        # only needs closed outlines, not thinned, hysteresis-linked edges
+        gx = cv2.convertScaleAbs(cv2.Sobel(processed, cv2.CV_16S, 1, 0, ksize=3))
+        gy = cv2.convertScaleAbs(cv2.Sobel(processed, cv2.CV_16S, 0, 1, ksize=3))
+        magnitude = cv2.add(gx, gy)
+        _, edges = cv2.threshold(magnitude, 150, 255, cv2.THRESH_BINARY)
         
-        # Morphological operations to connect edges
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
-        closed = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel, iterations=2)
+        # One small dilation to connect edges
+        closed = cv2.dilate(edges, self._dilate_kernel)
         
-        # Find contours
-        contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, 
-                                       cv2.CHAIN_APPROX_SIMPLE)
+        return closed
+    
+    def _cuda_ops(self) -> Dict:
+        """Per-thread GPU filter objects, created on first use"""
+        ops = getattr(self._buffers, 'cuda_ops', None)
+        if ops is None:
+            ops = {
+                'clahe': cv2.cuda.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8)),
+                'sobel_x': cv2.cuda.createSobelFilter(cv2.CV_8UC1, cv2.CV_16SC1, 1, 0, ksize=3),
+                'sobel_y': cv2.cuda.createSobelFilter(cv2.CV_8UC1, cv2.CV_16SC1, 0, 1, ksize=3),
+                'dilate': cv2.cuda.createMorphologyFilter(
+                    cv2.MORPH_DILATE, cv2.CV_8UC1, self._dilate_kernel),
+                'src': cv2.cuda_GpuMat(),
+            }
+            self._buffers.cuda_ops = ops
+        return ops
+    
+    def _edge_map_cuda(self, image: np.ndarray) -> np.ndarray:
+        """``_edge_map`` on the GPU: one upload, and only the edge map comes back"""
+        ops = self._cuda_ops()
+        gpu = ops['src']
+        gpu.upload(image)
         
-        tooth_regions = []
+        if len(image.shape) == 3:
+            gpu = cv2.cuda.cvtColor(gpu, cv2.COLOR_BGR2GRAY)
         
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            
-            # Filter by area
-            if self.min_tooth_area < area < self.max_tooth_area:
-                x, y, w, h = cv2.boundingRect(contour)
-                
-                # Calculate features
-                aspect_ratio = float(w) / h if h > 0 else 0
-                
-                # Teeth in panoramic X-rays typically have aspect ratio between 0.5 and 2.0
-                if 0.4 < aspect_ratio < 2.5:
-                    tooth_regions.append({
-                        'bbox': [x, y, x + w, y + h],
-                        'area': area,
-                        'width': w,
-                        'height': h,
-                        'aspect_ratio': aspect_ratio,
-                        'center': (x + w // 2, y + h // 2)
-                    })
+        enhanced = ops['clahe'].apply(gpu, cv2.cuda.Stream_Null())
+        if self.high_quality:
+            denoised = cv2.cuda.fastNlMeansDenoising(enhanced, 10, search_window=21, block_size=7)
+        else:
+            denoised = cv2.cuda.bilateralFilter(enhanced, 5, 40, 10)
+        normalized = cv2.cuda.normalize(denoised, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
         
-        return tooth_regions
+        gx = cv2.cuda.abs(ops['sobel_x'].apply(normalized)).convertTo(cv2.CV_8U)
+        gy = cv2.cuda.abs(ops['sobel_y'].apply(normalized)).convertTo(cv2.CV_8U)
+        magnitude = cv2.cuda.add(gx, gy)
+        _, edges = cv2.cuda.threshold(magnitude, 150, 255, cv2.THRESH_BINARY)
+        
+        return ops['dilate'].apply(edges).download()
     
-    def classify_teeth(self, tooth_regions: List[Dict], image_width: int) -> Dict:
+    def classify_teeth(self, tooth_regions: np.recarray, image_width: int) -> Dict:
         """
         Classify detected regions as primary molars or premolars
         Based on:
         1. Width (primary molars are wider)
         2. Position (left vs right side)
         3. Relative size comparison
+        
+        Sets the ``type`` column of ``tooth_regions`` in place.
         """
-        if not tooth_regions:
-            return {'primary_molars': [], 'premolars': []}
+        if len(tooth_regions) == 0:
+            return {'primary_molars': tooth_regions[:0], 'premolars': tooth_regions[:0]}
         
-        # Sort by width (descending)
-        sorted_by_width = sorted(tooth_regions, key=lambda x: x['width'], reverse=True)
+        widths = tooth_regions.w
         
         # Split into left and right halves
         mid_x = image_width / 2
-        left_teeth = [t for t in tooth_regions if t['center'][0] < mid_x]
-        right_teeth = [t for t in tooth_regions if t['center'][0] >= mid_x]
+        left_mask = tooth_regions.cx < mid_x
         
-        primary_molars = []
-        premolars = []
+        molar_idx = []
+        premolar_idx = []
         
         # Process each side
-        for side_teeth in [left_teeth, right_teeth]:
-            if len(side_teeth) < 2:
+        for side_mask in (left_mask, ~left_mask):
+            side_idx = np.flatnonzero(side_mask)
+            if len(side_idx) < 2:
                 continue
             
-            # Sort by width
-            side_sorted = sorted(side_teeth, key=lambda x: x['width'], reverse=True)
-            
             # Typically, the wider teeth are primary molars
-            # and narrower adjacent teeth are premolars
-            if len(side_sorted) >= 2:
-                potential_molar = side_sorted[0]
-                potential_premolar = side_sorted[1]
-                
-                # Check if width difference suggests molar vs premolar
-                width_ratio = potential_molar['width'] / potential_premolar['width']
-                
-                if width_ratio >= self.width_ratio_threshold:
-                    potential_molar['type'] = 'primary_molar'
-                    potential_premolar['type'] = 'premolar'
-                    primary_molars.append(potential_molar)
-                    premolars.append(potential_premolar)
-                else:
-                    # If not clear, mark as uncertain
-                    potential_molar['type'] = 'uncertain'
-                    potential_premolar['type'] = 'uncertain'
+            # and narrower adjacent teeth are premolars. Two argmax passes
+            # find the widest pair in O(N), ties going to the earlier region
+            side_widths = widths[side_idx].astype(np.float64)
+            first = int(np.argmax(side_widths))
+            side_widths[first] = -np.inf
+            second = int(np.argmax(side_widths))
+            
+            molar, premolar = side_idx[first], side_idx[second]
+            
+            # Check if width difference suggests molar vs premolar
+            width_ratio = widths[molar] / widths[premolar]
+            
+            if width_ratio >= self.width_ratio_threshold:
+                tooth_regions.type[molar] = TYPE_PRIMARY_MOLAR
+                tooth_regions.type[premolar] = TYPE_PREMOLAR
+                molar_idx.append(molar)
+                premolar_idx.append(premolar)
+            else:
+                # If not clear, mark as uncertain
+                tooth_regions.type[molar] = TYPE_UNCERTAIN
+                tooth_regions.type[premolar] = TYPE_UNCERTAIN
         
         return {
-            'primary_molars': primary_molars,
-            'premolars': premolars
+            'primary_molars': tooth_regions[np.array(molar_idx, dtype=np.intp)],
+            'premolars': tooth_regions[np.array(premolar_idx, dtype=np.intp)]
         }
     
-    def match_pairs(self, classified: Dict) -> List[Tuple[Dict, Dict]]:
+    def match_pairs(self, classified: Dict) -> Tuple[np.ndarray, np.ndarray]:
         """
         Match primary molars with corresponding premolars
         Based on spatial proximity
+        
+        Pairs minimize the total center distance (Hungarian assignment) when
+        SciPy is installed, otherwise each molar greedily takes its nearest
+        free premolar. Returns index arrays into ``primary_molars`` and
+        ``premolars``.
         """
         primary_molars = classified['primary_molars']
         premolars = classified['premolars']
         
-        pairs = []
-        used_premolars = set()
-        
-        for molar in primary_molars:
-            molar_center = molar['center']
-            min_dist = float('inf')
-            best_match = None
-            best_idx = None
+        molar_idx = []
+        premolar_idx = []
+        if len(primary_molars) and len(premolars):
+            # All molar-premolar squared center distances at once
+            dx = primary_molars.cx[:, None].astype(np.float32) - premolars.cx[None, :]
+            dy = primary_molars.cy[:, None].astype(np.float32) - premolars.cy[None, :]
+            d2 = dx * dx + dy * dy
             
-            for idx, premolar in enumerate(premolars):
-                if idx in used_premolars:
-                    continue
-                
-                premolar_center = premolar['center']
-                
-                # Calculate distance
-                dist = np.sqrt((molar_center[0] - premolar_center[0])**2 + 
-                             (molar_center[1] - premolar_center[1])**2)
-                
-                # Also check if they're on the same side
-                same_side = ((molar_center[0] < premolar_center[0]) or 
-                           (molar_center[0] > premolar_center[0]))
-                
-                if dist < min_dist and same_side:
-                    min_dist = dist
-                    best_match = premolar
-                    best_idx = idx
+            # Proximity threshold applied to the whole matrix up front:
+            # out-of-range candidates can never be the chosen match
+            too_far = d2 >= np.float32(self.max_pair_distance) ** 2
             
-            if best_match and min_dist < 300:  # Proximity threshold
-                pairs.append((molar, best_match))
-                used_premolars.add(best_idx)
-        
-        return pairs
+            if linear_sum_assignment is not None:
+                # Finite sentinel: the solver rejects infeasible (all-inf) rows
+                d2[too_far] = 1e12
+                rows, cols = linear_sum_assignment(d2)
+                matched = ~too_far[rows, cols]
+                return rows[matched].astype(np.intp), cols[matched].astype(np.intp)
+            
+            d2[too_far] = np.inf
+            for i in range(len(primary_molars)):
+                # Greedy: nearest premolar not taken by an earlier molar
+                best_idx = int(np.argmin(d2[i]))
+                if d2[i, best_idx] != np.inf:
+                    molar_idx.append(i)
+                    premolar_idx.append(best_idx)
+                    d2[:, best_idx] = np.inf
+        
+        return np.array(molar_idx, dtype=np.intp), np.array(premolar_idx, dtype=np.intp)
     
-    def calculate_measurements(self, pairs: List[Tuple[Dict, Dict]]) -> List[Dict]:
+    def calculate_measurements(self, pairs: Tuple[np.recarray, np.recarray]) -> List[Dict]:
         """
         Calculate width measurements and differences for each pair
+        
+        ``pairs`` holds the matched molars and premolars as row-aligned regions.
         """
-        results = []
+        molars, premolars = pairs
         
-        for molar, premolar in pairs:
-            # Convert pixel measurements to mm
-            molar_width_mm = (molar['width'] * self.mm_per_pixel) / self.magnification
-            premolar_width_mm = (premolar['width'] * self.mm_per_pixel) / self.magnification
-            
-            difference = molar_width_mm - premolar_width_mm
-            
-            # Determine if within normal clinical range (2.0-2.8mm)
-            within_normal = 2.0 <= difference <= 2.8
-            
+        # Convert pixel measurements to mm for every pair at once
+        molar_widths_mm = molars.w * self._px_to_mm_scale
+        premolar_widths_mm = premolars.w * self._px_to_mm_scale
+        differences = molar_widths_mm - premolar_widths_mm
+        
+        # Determine if within normal clinical range (2.0-2.8mm)
+        within_normal = (differences >= 2.0) & (differences <= 2.8)
+        needs_manual = (differences < 1.5) | (differences > 3.5)
+        
+        molar_boxes = np.stack([molars.x0, molars.y0, molars.x1, molars.y1], axis=1)
+        premolar_boxes = np.stack([premolars.x0, premolars.y0, premolars.x1, premolars.y1], axis=1)
+        
+        results = []
+        for molar_bbox, premolar_bbox, molar_mm, premolar_mm, difference, normal, manual in zip(
+                molar_boxes.tolist(), premolar_boxes.tolist(),
+                molar_widths_mm.tolist(), premolar_widths_mm.tolist(),
+                differences.tolist(), within_normal.tolist(), needs_manual.tolist()):
             results.append({
                 'primary_molar': {
-                    'bbox': molar['bbox'],
-                    'width_mm': round(molar_width_mm, 2),
+                    'bbox': molar_bbox,
+                    'width_mm': round(molar_mm, 2),
                     'confidence': 0.75  # Base confidence for image processing
                 },
                 'premolar': {
-                    'bbox': premolar['bbox'],
-                    'width_mm': round(premolar_width_mm, 2),
+                    'bbox': premolar_bbox,
+                    'width_mm': round(premolar_mm, 2),
                     'confidence': 0.75
                 },
                 'difference_mm': round(abs(difference), 2),
-                'within_normal_range': within_normal,
-                'requires_manual_verification': difference < 1.5 or difference > 3.5
+                'within_normal_range': normal,
+                'requires_manual_verification': manual
             })
         
         return results
     
+    @staticmethod
+    def regions_to_dicts(regions: np.recarray) -> List[Dict]:
+        """Per-region dicts for JSON output"""
+        dicts = []
+        for r in regions.tolist():
+            x0, y0, x1, y1, w, h, cx, cy, area, region_type = r
+            region = {
+                'bbox': [x0, y0, x1, y1],
+                'area': area,
+                'width': w,
+                'height': h,
+                'aspect_ratio': w / h,
+                'center': (cx, cy)
+            }
+            if region_type != TYPE_UNCLASSIFIED:
+                region['type'] = TYPE_NAMES[region_type]
+            dicts.append(region)
+        return dicts
+    
     def detect_and_analyze(self, image: np.ndarray) -> Dict:
         """
         Complete detection and analysis pipeline
         """
-        height, width = image.shape[:2] if len(image.shape) == 2 else image.shape[:2]
+        height, width = image.shape[:2]
         
         logger.info("Starting tooth detection...")
         
@@ -242,7 +501,7 @@ class SmartToothDetector:
             return {
                 'success': False,
                 'message': 'Insufficient tooth regions detected. Please use manual selection.',
-                'detected_regions': tooth_regions,
+                'detected_regions': self.regions_to_dicts(tooth_regions),
                 'requires_manual': True
             }
         
@@ -251,28 +510,30 @@ class SmartToothDetector:
         logger.info(f"Classified: {len(classified['primary_molars'])} molars, "
                    f"{len(classified['premolars'])} premolars")
         
-        if not classified['primary_molars'] or not classified['premolars']:
+        if len(classified['primary_molars']) == 0 or len(classified['premolars']) == 0:
             return {
                 'success': False,
                 'message': 'Could not identify tooth types. Please use manual selection.',
-                'detected_regions': tooth_regions,
+                'detected_regions': self.regions_to_dicts(tooth_regions),
                 'requires_manual': True
             }
         
         # Step 3: Match pairs
-        pairs = self.match_pairs(classified)
-        logger.info(f"Matched {len(pairs)} tooth pairs")
+        molar_idx, premolar_idx = self.match_pairs(classified)
+        logger.info(f"Matched {len(molar_idx)} tooth pairs")
         
-        if not pairs:
+        if len(molar_idx) == 0:
             return {
                 'success': False,
                 'message': 'Could not match tooth pairs. Please use manual selection.',
-                'detected_regions': tooth_regions,
-                'classified': classified,
+                'detected_regions': self.regions_to_dicts(tooth_regions),
+                'classified': {key: self.regions_to_dicts(regions)
+                               for key, regions in classified.items()},
                 'requires_manual': True
             }
         
         # Step 4: Calculate measurements
+        pairs = (classified['primary_molars'][molar_idx], classified['premolars'][premolar_idx])
         results = self.calculate_measurements(pairs)
         
         # Overall confidence score
@@ -288,6 +549,16 @@ class SmartToothDetector:
                       else 'Low confidence. Manual verification recommended.'
         }
     
+    def detect_and_analyze_batch(self, images: List[np.ndarray],
+                                 workers: Optional[int] = None) -> List[Dict]:
+        """
+        Run detect_and_analyze over many X-rays in parallel worker processes
+        
+        Results are returned in input order.
+        """
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            return list(pool.map(self.detect_and_analyze, images))
+    
     def draw_detections(self, image: np.ndarray, analysis_result: Dict) -> np.ndarray:
         """
         Draw bounding boxes and measurements on the image
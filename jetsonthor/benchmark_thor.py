@@ -13,15 +13,39 @@ import time
 import torch
 import cv2
 import numpy as np
+from contextlib import nullcontext
 from pathlib import Path
+from torch.utils.data import DataLoader, Dataset
 from ultralytics import YOLO
 import glob
 
+
+class CyclicImages(Dataset):
+    """``length`` samples cycling through a fixed stack of preprocessed images"""
+    def __init__(self, images, length):
+        self.images = images
+        self.length = length
+        
+    def __len__(self):
+        return self.length
+        
+    def __getitem__(self, index):
+        return self.images[index % len(self.images)]
+
+
 class ThorBenchmark:
-    def __init__(self):
+    def __init__(self, imgsz=640, forward_only=False):
         self.device = 0 if torch.cuda.is_available() else 'cpu'
+        self.imgsz = imgsz
+        # Time only the network forward pass, without NMS and Results objects
+        self.forward_only = forward_only
+        # FP16 inference for PyTorch models on the GPU; engines carry their own precision
+        self.half = torch.cuda.is_available()
         self.results = []
         
+        # Fixed input shapes: let cuDNN pick its fastest kernels once
+        torch.backends.cudnn.benchmark = True
+        
     def get_test_images(self, num_images=10):
         """Load test images"""
         image_paths = glob.glob('data/samples/*.jpg')[:num_images]
@@ -39,12 +63,41 @@ class ThorBenchmark:
         print(f"✅ Loaded {len(images)} test images")
         return images
         
-    def warmup(self, model, images, num_warmup=10):
+    def to_host_tensor(self, images):
+        """Resize and stack images into a uint8 NCHW tensor on the host"""
+        batch = np.stack([
+            cv2.cvtColor(cv2.resize(img, (self.imgsz, self.imgsz)), cv2.COLOR_BGR2RGB)
+            for img in images
+        ])
+        return torch.from_numpy(batch).permute(0, 3, 1, 2).contiguous()
+        
+    def to_tensor(self, images):
+        """Resize, stack and upload images once as an NCHW float tensor in [0, 1]
+        
+        Feeding this to model.predict skips per-call letterboxing and
+        host-to-device copies, so the timing loop measures the model only.
+        """
+        tensor = self.to_host_tensor(images)
+        if torch.cuda.is_available():
+            tensor = tensor.pin_memory().to(self.device, non_blocking=True)
+        return tensor.float().div_(255.0)
+        
+    def _upload(self, batch):
+        """Move a uint8 host batch to the device as float in [0, 1]"""
+        return batch.to(self.device, non_blocking=True).float().div_(255.0)
+        
+    def _sync(self):
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+        
+    def warmup(self, model, batches, num_warmup=10):
         """Warm up model for accurate benchmarking"""
         print("🔥 Warming up model...")
-        for _ in range(num_warmup):
-            for img in images[:3]:  # Use first 3 images
-                _ = model.predict(img, verbose=False)
+        with torch.inference_mode():
+            for _ in range(num_warmup):
+                for batch in batches[:3]:  # Use first 3 batches
+                    _ = model.predict(batch, verbose=False, device=self.device, half=self.half)
+        self._sync()
         print("✅ Warmup complete")
         
     def benchmark_model(self, model_path, images, num_runs=100):
@@ -59,16 +112,34 @@ class ThorBenchmark:
         model = YOLO(model_path)
         model.to(self.device)
         
-        # Warmup
-        self.warmup(model, images)
+        # Preprocess and upload once. Every format runs one image per call
+        # (engines are exported with a static batch of 1), so the averages
+        # are per-image latencies that compare across formats; batched
+        # throughput is measured by benchmark_batch_processing
+        batches = self.to_tensor(images).split(1)
+        
+        # Warmup (also sets up model.predictor)
+        self.warmup(model, batches)
+        
+        if self.forward_only:
+            # Cast to the predictor's device and precision once, up front
+            predictor = model.predictor
+            batches = [predictor.preprocess(batch) for batch in batches]
+            run = predictor.inference
+        else:
+            def run(batch):
+                return model.predict(batch, verbose=False, device=self.device, half=self.half)
         
         # Benchmark
         print(f"🏃 Running {num_runs} inferences...")
         
+        self._sync()
         start_time = time.time()
-        for _ in range(num_runs):
-            for img in images:
-                _ = model.predict(img, verbose=False, device=self.device)
+        with torch.inference_mode():
+            for _ in range(num_runs):
+                for batch in batches:
+                    _ = run(batch)
+        self._sync()
         end_time = time.time()
         
         # Calculate metrics
@@ -103,53 +174,91 @@ class ThorBenchmark:
         model = YOLO(model_path)
         model.to(self.device)
         
+        cuda = torch.cuda.is_available()
+        streams = [torch.cuda.Stream(), torch.cuda.Stream()] if cuda else []
+        host_images = self.to_host_tensor(images)
+        
         batch_results = []
         
         for batch_size in batch_sizes:
             print(f"\n  Batch size: {batch_size}")
             
-            # Create batches
+            # Loader workers collate pinned batches while the GPU runs the
+            # previous one; every batch really holds batch_size images
             num_batches = 50
-            batches = []
-            for _ in range(num_batches):
-                batch = images[:batch_size]
-                batches.append(batch)
+            dataset = CyclicImages(host_images, num_batches * batch_size)
+            loader = DataLoader(dataset, batch_size=batch_size, num_workers=4,
+                                pin_memory=cuda, persistent_workers=True)
             
             # Warmup
-            for _ in range(5):
-                _ = model.predict(batches[0], verbose=False, device=self.device)
+            warmup_batch = next(iter(loader))
+            with torch.inference_mode():
+                for _ in range(5):
+                    _ = model.predict(self._upload(warmup_batch), verbose=False,
+                                      device=self.device, half=self.half)
             
-            # Benchmark
+            # Benchmark: alternate two CUDA streams so the next upload
+            # overlaps the current forward pass
+            self._sync()
             start_time = time.time()
-            for batch in batches:
-                _ = model.predict(batch, verbose=False, device=self.device)
+            with torch.inference_mode():
+                for i, batch in enumerate(loader):
+                    with torch.cuda.stream(streams[i % 2]) if cuda else nullcontext():
+                        _ = model.predict(self._upload(batch), verbose=False,
+                                          device=self.device, half=self.half)
+            self._sync()
             end_time = time.time()
             
             total_time = end_time - start_time
             total_images = num_batches * batch_size
             throughput = total_images / total_time
-            latency = (total_time / total_images) * 1000
+            # Images in a batch finish together: latency is per batch
+            batch_latency = (total_time / num_batches) * 1000
             
             result = {
                 'batch_size': batch_size,
                 'throughput': throughput,
-                'latency_ms': latency
+                'batch_latency_ms': batch_latency
             }
             
             print(f"    Throughput: {throughput:.1f} images/sec")
-            print(f"    Latency: {latency:.2f} ms/image")
+            print(f"    Latency: {batch_latency:.2f} ms/batch")
             
             batch_results.append(result)
             
         return batch_results
         
-    def compare_formats(self, base_model_path, images):
+    def export_engine(self, pt_path, int8=False, calib_data='dataset/data.yaml'):
+        """Export a TensorRT engine next to the .pt model (FP16, or INT8 with calibration)"""
+        print(f"\n⚙️  Exporting TensorRT engine ({'INT8' if int8 else 'FP16'}): {pt_path}")
+        
+        export_args = {
+            'format': 'engine',
+            'device': self.device,
+            'half': not int8,
+            'workspace': 4,
+        }
+        if int8:
+            if not Path(calib_data).exists():
+                print(f"⚠️  INT8 calibration data not found: {calib_data}, using FP16")
+                export_args['half'] = True
+            else:
+                export_args['int8'] = True
+                export_args['data'] = calib_data
+        
+        return YOLO(pt_path).export(**export_args)
+        
+    def compare_formats(self, base_model_path, images, int8=False, calib_data='dataset/data.yaml'):
         """Compare PyTorch vs TensorRT"""
         print("\n🔥 Format Comparison: PyTorch vs TensorRT")
         
         pt_path = base_model_path
         engine_path = str(Path(base_model_path).with_suffix('.engine'))
         
+        # Build the engine on first run instead of only benchmarking the .pt
+        if not Path(engine_path).exists() and Path(pt_path).exists() and torch.cuda.is_available():
+            engine_path = str(self.export_engine(pt_path, int8=int8, calib_data=calib_data))
+        
         results = {}
         
         # Benchmark PyTorch
@@ -161,7 +270,7 @@ class ThorBenchmark:
             results['tensorrt'] = self.benchmark_model(engine_path, images, num_runs=50)
         else:
             print(f"⚠️  TensorRT engine not found: {engine_path}")
-            print("💡 Generate with: python3 train_thor.py --export")
+            print("💡 TensorRT export needs a CUDA device")
             
         # Compare
         if 'pytorch' in results and 'tensorrt' in results:
@@ -170,6 +279,27 @@ class ThorBenchmark:
             
         return results
         
+    RESULT_DTYPE = np.dtype([
+        ('model', 'U32'),
+        ('latency_ms', 'f4'),
+        ('fps', 'f4'),
+        ('throughput', 'f4'),
+    ])
+        
+    def results_array(self):
+        """Benchmark results as one structured array, one row per model"""
+        return np.array(
+            [(r['model'], r['avg_latency_ms'], r['fps'], r['throughput']) for r in self.results],
+            dtype=self.RESULT_DTYPE
+        )
+        
+    def save_results(self, csv_path):
+        """Write all results to a CSV file in one call"""
+        np.savetxt(csv_path, self.results_array(), delimiter=',',
+                   fmt=['%s', '%.2f', '%.1f', '%.1f'],
+                   header=','.join(self.RESULT_DTYPE.names), comments='')
+        print(f"💾 Results saved to {csv_path}")
+        
     def print_summary(self):
         """Print benchmark summary"""
         if not self.results:
@@ -182,11 +312,8 @@ class ThorBenchmark:
         print(f"\n{'Model':<30} {'Latency (ms)':<15} {'FPS':<10} {'Throughput':<15}")
         print("-"*70)
         
-        for result in self.results:
-            print(f"{result['model']:<30} "
-                  f"{result['avg_latency_ms']:<15.2f} "
-                  f"{result['fps']:<10.1f} "
-                  f"{result['throughput']:<15.1f}")
+        for model, latency, fps, throughput in self.results_array().tolist():
+            print(f"{model:<30} {latency:<15.2f} {fps:<10.1f} {throughput:<15.1f}")
                   
         print("="*70)
 
@@ -222,10 +349,36 @@ def main():
         help='Run all benchmarks'
     )
     
+    parser.add_argument(
+        '--forward-only',
+        action='store_true',
+        help='Time only the network forward pass (no NMS / result objects); '
+             'not comparable with full predict timings'
+    )
+    
+    parser.add_argument(
+        '--csv',
+        type=str,
+        help='Also write the summary to this CSV file'
+    )
+    
+    parser.add_argument(
+        '--int8',
+        action='store_true',
+        help='Export the TensorRT engine with INT8 calibration'
+    )
+    
+    parser.add_argument(
+        '--calib-data',
+        type=str,
+        default='dataset/data.yaml',
+        help='Dataset yaml used for INT8 calibration'
+    )
+    
     args = parser.parse_args()
     
     # Create benchmark
-    benchmark = ThorBenchmark()
+    benchmark = ThorBenchmark(forward_only=args.forward_only)
     
     print("🦷 Dentescope-AI Inference Benchmark")
     print("🚀 Platform: NVIDIA Jetson AGX Thor")
@@ -254,13 +407,13 @@ def main():
         benchmark.benchmark_model(args.model, images)
         
         # Compare formats
-        benchmark.compare_formats(args.model, images)
+        benchmark.compare_formats(args.model, images, int8=args.int8, calib_data=args.calib_data)
         
         # Batch processing
         benchmark.benchmark_batch_processing(args.model, images)
         
     elif args.compare:
-        benchmark.compare_formats(args.model, images)
+        benchmark.compare_formats(args.model, images, int8=args.int8, calib_data=args.calib_data)
         
     elif args.batch:
         benchmark.benchmark_batch_processing(args.model, images)
@@ -271,6 +424,8 @@ def main():
     
     # Print summary
     benchmark.print_summary()
+    if args.csv and benchmark.results:
+        benchmark.save_results(args.csv)
     
     print("\n💡 Tips for Maximum Performance:")
     print("  1. Export to TensorRT: python3 train_thor.py --export")
@@ -7,27 +7,475 @@ Author: Ajeet Singh Raina
 Hardware: NVIDIA Jetson AGX Thor (128GB, 2070 TFLOPS)
 """
 
+import functools
+import io
 import os
 import sys
 import time
-import torch
-from ultralytics import YOLO
 from pathlib import Path
 import json
+import math
+import re
+import types
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from copy import deepcopy
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# torch and ultralytics are imported where they are used: importing them
+# costs seconds on Jetson, which `--help` and argument errors should not pay
+
+# One OpenMP thread per dataloader worker; the workers themselves provide
+# the parallelism. Must be set before torch is imported.
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+
+# YOLOv8 layers 0-9 form the backbone (through SPPF); 10+ are neck and head
+BACKBONE_BLOCKS = 10
+
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png')
+
+# Leave two of Thor's 14 CPU cores for the main training process
+MAX_WORKERS = max(8, (os.cpu_count() or 8) - 2)
+
+
+def _write_json(path, obj):
+    """Write indented JSON via a temp file and rename, so readers never see a partial file"""
+    if orjson is not None:
+        data = orjson.dumps(obj, default=str, option=orjson.OPT_INDENT_2)
+    else:
+        data = json.dumps(obj, default=str, indent=2).encode('utf-8')
+    tmp = Path(path).with_suffix('.json.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _disable_grad_scaler(trainer):
+    """BF16 has FP32's exponent range, so loss scaling is unnecessary"""
+    import torch
+    
+    trainer.scaler = torch.cuda.amp.GradScaler(enabled=False)
+
+
+def _channels_last(trainer):
+    """Train in NHWC so cuDNN picks tensor-core conv kernels without transposes"""
+    import torch
+    
+    trainer.model.to(memory_format=torch.channels_last)
+    preprocess_batch = trainer.preprocess_batch
+    
+    def preprocess_nhwc(batch):
+        batch = preprocess_batch(batch)
+        batch['img'] = batch['img'].contiguous(memory_format=torch.channels_last)
+        return batch
+    
+    # The batch is not exposed to callbacks, so wrap the trainer's own hook
+    trainer.preprocess_batch = preprocess_nhwc
+
+
+def _fused_optimizer(optimizer):
+    """Same param groups, stepped by one multi-tensor kernel instead of one per tensor"""
+    import torch
+    try:
+        from apex.optimizers import FusedAdam, FusedSGD
+    except ImportError:
+        FusedAdam = FusedSGD = None
+        
+    # Drop per-group implementation flags so they don't override fused=True
+    groups = [{k: v for k, v in group.items() if k not in ('foreach', 'fused', 'capturable', 'differentiable')}
+              for group in optimizer.param_groups]
+    lr = groups[0]['lr']
+    kind = type(optimizer)
+    
+    try:
+        if kind is torch.optim.SGD:
+            if FusedSGD is not None:
+                return FusedSGD(groups, lr=lr)
+            return torch.optim.SGD(groups, lr=lr, fused=True)
+        if kind in (torch.optim.Adam, torch.optim.AdamW):
+            if FusedAdam is not None:
+                return FusedAdam(groups, lr=lr, adam_w_mode=kind is torch.optim.AdamW)
+            return kind(groups, lr=lr, fused=True)
+    except (TypeError, RuntimeError):
+        # Older PyTorch without a fused kernel for this optimizer
+        pass
+    return optimizer
+
+
+def _use_fused_optimizer(trainer):
+    """Have the trainer build fused optimizers; the scheduler is built afterwards"""
+    build_optimizer = trainer.build_optimizer
+    
+    def build_fused(*args, **kwargs):
+        return _fused_optimizer(build_optimizer(*args, **kwargs))
+    
+    trainer.build_optimizer = build_fused
+
+
+def _to_cpu(obj):
+    """Recursively move tensors in a (nested) state dict to host memory"""
+    import torch
+    
+    if isinstance(obj, torch.Tensor):
+        return obj.to('cpu')
+    if isinstance(obj, dict):
+        return {k: _to_cpu(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_to_cpu(v) for v in obj)
+    return obj
+
+
+class AsyncCheckpointer:
+    """Write Ultralytics checkpoints on a background thread, one at a time"""
+    
+    def __init__(self):
+        import torch
+        
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='checkpoint')
+        self.stream = torch.cuda.Stream() if torch.cuda.is_available() else None
+        self.pending = None
+        
+    def attach(self, trainer):
+        """on_pretrain_routine_start callback replacing trainer.save_model"""
+        final_eval = trainer.final_eval
+        
+        def final_eval_after_save():
+            # final_eval reloads best.pt, so the last write must have landed
+            self.wait()
+            return final_eval()
+        
+        trainer.save_model = lambda: self.save(trainer)
+        trainer.final_eval = final_eval_after_save
+        
+    def wait(self):
+        """Block until the in-flight checkpoint is written, re-raising its error"""
+        if self.pending is not None:
+            pending, self.pending = self.pending, None
+            pending.result()
+            
+    def save(self, trainer):
+        import torch
+        from ultralytics import __version__ as ultralytics_version
+        
+        # Bound memory to a single snapshot in flight
+        self.wait()
+        
+        # Snapshot on the training thread as device-side copies; the
+        # host transfer and serialization happen in the background
+        ckpt = {
+            'epoch': trainer.epoch,
+            'best_fitness': trainer.best_fitness,
+            'model': None,
+            'ema': deepcopy(trainer.ema.ema).half(),
+            'updates': trainer.ema.updates,
+            'optimizer': deepcopy(trainer.optimizer.state_dict()),
+            'train_args': dict(vars(trainer.args)),
+            'train_metrics': {**trainer.metrics, 'fitness': trainer.fitness},
+            'date': datetime.now().isoformat(),
+            'version': ultralytics_version,
+        }
+        
+        paths = [trainer.last]
+        if trainer.best_fitness == trainer.fitness:
+            paths.append(trainer.best)
+        if trainer.save_period > 0 and trainer.epoch % trainer.save_period == 0:
+            paths.append(trainer.wdir / f'epoch{trainer.epoch}.pt')
+            
+        if self.stream is not None:
+            self.stream.wait_stream(torch.cuda.current_stream())
+        self.pending = self.executor.submit(self._write, ckpt, paths)
+        
+    def _write(self, ckpt, paths):
+        import torch
+        
+        with torch.cuda.stream(self.stream) if self.stream is not None else nullcontext():
+            ckpt['ema'] = ckpt['ema'].to('cpu')
+            ckpt['optimizer'] = _to_cpu(ckpt['optimizer'])
+            
+        buffer = io.BytesIO()
+        torch.save(ckpt, buffer)
+        data = buffer.getvalue()
+        for path in paths:
+            path.write_bytes(data)
+
+
+def _gpu_hsv(trainer, gains):
+    """Apply Ultralytics' random HSV gains to each training batch on the GPU"""
+    import kornia
+    import torch
+    
+    gains = torch.tensor(gains, device=trainer.device)
+    preprocess_batch = trainer.preprocess_batch
+    
+    def preprocess_hsv(batch):
+        batch = preprocess_batch(batch)
+        img = batch['img']
+        # Same per-image gains as RandomHSV: uniform(-1, 1) * gain + 1
+        r = (torch.rand(img.shape[0], 3, device=img.device) * 2 - 1) * gains + 1
+        r = r[:, :, None, None]
+        hsv = kornia.color.rgb_to_hsv(img.float())
+        h = (hsv[:, 0] * r[:, 0]) % (2 * math.pi)
+        s = (hsv[:, 1] * r[:, 1]).clamp_(0, 1)
+        v = (hsv[:, 2] * r[:, 2]).clamp_(0, 1)
+        batch['img'] = kornia.color.hsv_to_rgb(torch.stack((h, s, v), 1)).to(img.dtype)
+        return batch
+    
+    trainer.preprocess_batch = preprocess_hsv
+
+
+def _compile_model(trainer):
+    """Compile the network's layers with TorchInductor"""
+    # Layer by layer rather than the whole model: DetectionModel.forward on a
+    # batch dict also runs the loss, whose target tensors are sized by each
+    # batch's box count. The layers see fixed image shapes except for a
+    # smaller last batch, which the default dynamic=None absorbs with one
+    # recompile. In place, so state_dict keys (and the EMA) are unchanged
+    for layer in trainer.model.model:
+        layer.compile()
+
+
+class CudaPrefetcher:
+    """Train loader wrapper that uploads the next batch while the current one trains"""
+    
+    def __init__(self, loader, device):
+        import torch
+        
+        self.loader = loader
+        self.device = device
+        self.stream = torch.cuda.Stream(device)
+        
+    def __len__(self):
+        return len(self.loader)
+        
+    def __getattr__(self, name):
+        # dataset, reset(), num_workers, ... of the wrapped loader
+        return getattr(self.loader, name)
+        
+    def _upload(self, batch):
+        import torch
+        
+        with torch.cuda.stream(self.stream):
+            return {k: v.to(self.device, non_blocking=True) if isinstance(v, torch.Tensor) else v
+                    for k, v in batch.items()}
+            
+    def _ready(self, batch, stream):
+        import torch
+        
+        stream.wait_stream(self.stream)
+        # The tensors were allocated on the copy stream; keep the caching
+        # allocator from reusing them while the compute stream still reads them
+        for value in batch.values():
+            if isinstance(value, torch.Tensor):
+                value.record_stream(stream)
+        return batch
+        
+    def __iter__(self):
+        import torch
+        
+        stream = torch.cuda.current_stream(self.device)
+        batches = iter(self.loader)
+        try:
+            pending = self._upload(next(batches))
+        except StopIteration:
+            return
+        for batch in batches:
+            ready = self._ready(pending, stream)
+            pending = self._upload(batch)
+            yield ready
+        yield self._ready(pending, stream)
+
+
+def _prefetch_to_device(trainer):
+    """Overlap host-to-device batch copies with compute
+    
+    Ultralytics already pins train batches (its PIN_MEMORY setting, on by
+    default), which the non-blocking uploads rely on.
+    """
+    trainer.train_loader = CudaPrefetcher(trainer.train_loader, trainer.device)
+
+
+@functools.lru_cache(maxsize=1)
+def _gpu_info():
+    """(name, memory GB, CUDA version) of GPU 0, queried from the driver once"""
+    import torch
+    
+    props = torch.cuda.get_device_properties(0)
+    return props.name, props.total_memory / (1024**3), torch.version.cuda
+
+
+def _letterbox(image_path, imgsz):
+    """Ultralytics-style letterboxed RGB float CHW input for calibration"""
+    import cv2
+    import numpy as np
+    
+    image = cv2.imread(str(image_path), cv2.IMREAD_COLOR)
+    h, w = image.shape[:2]
+    r = min(imgsz / h, imgsz / w)
+    nh, nw = round(h * r), round(w * r)
+    canvas = np.full((imgsz, imgsz, 3), 114, np.uint8)
+    top, left = (imgsz - nh) // 2, (imgsz - nw) // 2
+    canvas[top:top + nh, left:left + nw] = cv2.resize(image, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    return canvas[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+
+
+def _letterbox_cuda(image_path, imgsz, out):
+    """Decode a JPEG with nvJPEG and letterbox it on the GPU into ``out``"""
+    import torch.nn.functional as F
+    from torchvision.io import ImageReadMode, decode_jpeg, read_file
+    
+    image = decode_jpeg(read_file(str(image_path)), mode=ImageReadMode.RGB, device='cuda')
+    h, w = image.shape[1:]
+    r = min(imgsz / h, imgsz / w)
+    nh, nw = round(h * r), round(w * r)
+    top, left = (imgsz - nh) // 2, (imgsz - nw) // 2
+    out.fill_(114 / 255.0)
+    resized = F.interpolate(image[None].float(), size=(nh, nw), mode='bilinear', align_corners=False)
+    out[:, top:top + nh, left:left + nw] = resized[0] / 255.0
+
+
+def build_mixed_engine(onnx_path, engine_path, calib_images, imgsz, batch=8,
+                       int8_blocks=BACKBONE_BLOCKS, workspace_gb=4):
+    """Build a TensorRT engine with an INT8 backbone and an FP16 neck/head"""
+    import tensorrt as trt
+    import torch
+    
+    try:
+        import torchvision.io
+        gpu_decode = True
+    except ImportError:
+        gpu_decode = False
+        
+    cache_file = Path(engine_path).with_name('dental_int8.cache')
+    
+    class EntropyCalibrator(trt.IInt8EntropyCalibrator2):
+        def __init__(self):
+            super().__init__()
+            self.index = 0
+            # Reused for every batch; TensorRT reads it by device pointer
+            self.device_input = torch.zeros((batch, 3, imgsz, imgsz), device='cuda')
+            
+        def get_batch_size(self):
+            return batch
+            
+        def get_batch(self, names):
+            if self.index >= len(calib_images):
+                return None
+            paths = calib_images[self.index:self.index + batch]
+            self.index += batch
+            self.device_input.zero_()
+            for i, path in enumerate(paths):
+                if gpu_decode and path.suffix.lower() in ('.jpg', '.jpeg'):
+                    _letterbox_cuda(path, imgsz, self.device_input[i])
+                else:
+                    self.device_input[i] = torch.from_numpy(_letterbox(path, imgsz)).cuda()
+            torch.cuda.synchronize()
+            return [int(self.device_input.data_ptr())]
+            
+        def read_calibration_cache(self):
+            if cache_file.exists():
+                return cache_file.read_bytes()
+            return None
+            
+        def write_calibration_cache(self, cache):
+            cache_file.write_bytes(bytes(cache))
+            
+    logger = trt.Logger(trt.Logger.INFO)
+    builder = trt.Builder(logger)
+    network = builder.create_network(1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH))
+    parser = trt.OnnxParser(network, logger)
+    if not parser.parse(Path(onnx_path).read_bytes()):
+        errors = [str(parser.get_error(i)) for i in range(parser.num_errors)]
+        raise RuntimeError(f"ONNX parse failed: {errors}")
+        
+    config = builder.create_builder_config()
+    config.set_memory_pool_limit(trt.MemoryPoolType.WORKSPACE, workspace_gb << 30)
+    config.set_flag(trt.BuilderFlag.FP16)
+    config.set_flag(trt.BuilderFlag.INT8)
+    config.set_flag(trt.BuilderFlag.PREFER_PRECISION_CONSTRAINTS)
+    config.int8_calibrator = EntropyCalibrator()
+    
+    # Dynamic batch from 1 up to the calibration batch
+    input_name = network.get_input(0).name
+    profile = builder.create_optimization_profile()
+    profile.set_shape(input_name, (1, 3, imgsz, imgsz), (batch, 3, imgsz, imgsz), (batch, 3, imgsz, imgsz))
+    config.add_optimization_profile(profile)
+    config.set_calibration_profile(profile)
+    
+    # Layer names follow the ONNX export, e.g. /model.4/cv1/conv/Conv
+    block = re.compile(r'^/model\.(\d+)/')
+    n_int8 = 0
+    for i in range(network.num_layers):
+        layer = network.get_layer(i)
+        match = block.match(layer.name)
+        if match and int(match.group(1)) < int8_blocks:
+            layer.precision = trt.int8
+            n_int8 += 1
+        elif layer.type not in (trt.LayerType.SHAPE, trt.LayerType.CONSTANT):
+            layer.precision = trt.float16
+            
+    print(f"  INT8 layers: {n_int8}/{network.num_layers}")
+    serialized = builder.build_serialized_network(network, config)
+    if serialized is None:
+        raise RuntimeError("TensorRT engine build failed")
+    Path(engine_path).write_bytes(bytes(serialized))
+    return str(engine_path)
+
+
 class ThorDentalTrainer:
-    def __init__(self, model_size='m', project_name='dental_thor'):
+    # Run-independent training arguments, shared by every trainer
+    _IO_DEFAULTS = types.MappingProxyType({
+        # Thor optimizations
+        'cache': 'disk',         # Decoded .npy next to each image on NVMe
+        'amp': True,             # Mixed precision
+        'deterministic': False,  # Keep cuDNN autotuning enabled
+        
+        # Training settings
+        'patience': 20,          # Early stopping
+        'save': True,
+        'save_period': 10,       # Save every 10 epochs
+        'plots': True,
+        'verbose': True,
+        
+        # Output
+        'project': 'runs/detect',
+        'exist_ok': True,
+    })
+    
+    _AUG_DEFAULTS = types.MappingProxyType({
+        'hsv_h': 0.015,
+        'hsv_s': 0.7,
+        'hsv_v': 0.4,
+        'degrees': 10.0,
+        'translate': 0.1,
+        'scale': 0.5,
+        'shear': 2.0,
+        'perspective': 0.0,
+        'flipud': 0.5,
+        'fliplr': 0.5,
+        'mosaic': 1.0,
+        'mixup': 0.1,
+    })
+    
+    def __init__(self, model_size='m', project_name='dental_thor', devices=None, run_name=None):
         """
         Initialize trainer for Jetson Thor
         
         Args:
             model_size: 'n', 's', 'm', 'l', 'x' (nano to extra-large)
             project_name: Name for this training run
+            devices: CUDA devices to train on, e.g. '0,1' for DDP (default: GPU 0)
+            run_name: Output directory under runs/detect (default: timestamped)
         """
+        import torch
+        
         self.model_size = model_size
         self.project_name = project_name
-        self.device = 0 if torch.cuda.is_available() else 'cpu'
+        self.run_name = run_name or f'{project_name}_{model_size}_{datetime.now():%Y%m%d_%H%M}'
+        self.device = devices or (0 if torch.cuda.is_available() else 'cpu')
         
         # Thor-optimized settings
         self.thor_config = {
@@ -38,8 +486,33 @@ class ThorDentalTrainer:
             'x': {'batch': 16, 'epochs': 200, 'imgsz': 1280},  # Maximum
         }
         
+        # Image counts per split, so repeated dataset checks skip the scan
+        self._image_counts = {}
+        
+    def num_workers(self, imgsz):
+        """Dataloader workers: larger images need more decode/augment workers"""
+        if imgsz <= 640:
+            return min(8, MAX_WORKERS)
+        return MAX_WORKERS
+        
+    def use_gpu_hsv(self):
+        """HSV augmentation runs on the GPU when Kornia is installed
+        
+        Single-device runs only: DDP workers are rebuilt from train_args
+        without the _gpu_hsv callback, so they keep the CPU HSV gains.
+        """
+        if ',' in str(self.device):
+            return False
+        try:
+            import kornia
+        except ImportError:
+            return False
+        return True
+        
     def check_system(self):
         """Verify Thor system requirements"""
+        import torch
+        
         print("🔍 Checking System...")
         
         # Check CUDA
@@ -48,16 +521,26 @@ class ThorDentalTrainer:
             return False
             
         # Check GPU
-        gpu_name = torch.cuda.get_device_name(0)
-        gpu_memory = torch.cuda.get_device_properties(0).total_memory / (1024**3)
+        gpu_name, gpu_memory, cuda_version = _gpu_info()
         
         print(f"✅ GPU: {gpu_name}")
         print(f"✅ GPU Memory: {gpu_memory:.1f} GB")
         print(f"✅ PyTorch: {torch.__version__}")
-        print(f"✅ CUDA: {torch.version.cuda}")
+        print(f"✅ CUDA: {cuda_version}")
         
         return True
         
+    def count_images(self, split):
+        """Number of images in dataset/<split>/images, scanned once per trainer"""
+        if split not in self._image_counts:
+            try:
+                with os.scandir(Path('dataset') / split / 'images') as entries:
+                    count = sum(1 for entry in entries if entry.name.lower().endswith(IMAGE_SUFFIXES))
+            except FileNotFoundError:
+                count = 0
+            self._image_counts[split] = count
+        return self._image_counts[split]
+        
     def check_dataset(self):
         """Verify dataset exists and is properly formatted"""
         print("\n📊 Checking Dataset...")
@@ -71,24 +554,35 @@ class ThorDentalTrainer:
             return False
             
         # Count images
-        train_imgs = list((dataset_path / 'train' / 'images').glob('*.jpg'))
-        val_imgs = list((dataset_path / 'val' / 'images').glob('*.jpg'))
+        n_train = self.count_images('train')
+        n_val = self.count_images('val')
         
-        print(f"✅ Training images: {len(train_imgs)}")
-        print(f"✅ Validation images: {len(val_imgs)}")
+        print(f"✅ Training images: {n_train}")
+        print(f"✅ Validation images: {n_val}")
         
-        if len(train_imgs) < 10:
+        if n_train < 10:
             print("⚠️  Warning: Very few training images. Consider adding more.")
             
         return True
         
     def train(self, resume=False):
         """Start training with Thor-optimized settings"""
+        import torch
+        from ultralytics import YOLO
         
         # System checks
         if not self.check_system():
             return None
             
+        # Tensor-core math for FP32 matmuls/convs, and cuDNN autotuning.
+        # Autotuning only pays off because input shapes are static: imgsz
+        # is fixed per model size in thor_config and rect batching is off.
+        if torch.cuda.is_available():
+            torch.backends.cudnn.benchmark = True
+            torch.backends.cuda.matmul.allow_tf32 = True
+            torch.backends.cudnn.allow_tf32 = True
+            torch.set_float32_matmul_precision('high')
+            
         if not self.check_dataset():
             return None
             
@@ -106,58 +600,62 @@ class ThorDentalTrainer:
         # Training arguments
         train_args = {
             'data': 'dataset/data.yaml',
-            'epochs': config['epochs'],
-            'imgsz': config['imgsz'],
-            'batch': config['batch'],
-            'device': self.device,
-            
-            # Thor optimizations
-            'cache': True,           # Use 128GB RAM!
-            'amp': True,             # Mixed precision
-            'workers': 8,            # Multi-threading
-            
-            # Training settings
-            'patience': 20,          # Early stopping
-            'save': True,
-            'save_period': 10,       # Save every 10 epochs
-            'plots': True,
-            'verbose': True,
-            
-            # Augmentation
-            'hsv_h': 0.015,
-            'hsv_s': 0.7,
-            'hsv_v': 0.4,
-            'degrees': 10.0,
-            'translate': 0.1,
-            'scale': 0.5,
-            'shear': 2.0,
-            'perspective': 0.0,
-            'flipud': 0.5,
-            'fliplr': 0.5,
-            'mosaic': 1.0,
-            'mixup': 0.1,
-            
-            # Output
-            'project': 'runs/detect',
-            'name': f'{self.project_name}_{self.model_size}_{datetime.now().strftime("%Y%m%d_%H%M")}',
-            'exist_ok': True,
+            **config,
+            'device': self.device,  # A device list launches DDP over NCCL
+            'workers': self.num_workers(config['imgsz']),  # JPEG decode + augmentation
+            **self._IO_DEFAULTS,
+            **self._AUG_DEFAULTS,
+            'name': self.run_name,
         }
         
         if resume:
-            train_args['resume'] = True
+            # Resume this run's checkpoint; plain True makes Ultralytics pick
+            # whichever run under runs/ was written last
+            last = Path(train_args['project']) / self.run_name / 'weights' / 'last.pt'
+            train_args['resume'] = str(last) if last.exists() else True
             
+        # Ultralytics autocasts without an explicit dtype, so an enclosing
+        # BF16 autocast sets the dtype its training loop picks up; older
+        # GPUs without BF16 keep the default FP16 + GradScaler path
+        bf16 = torch.cuda.is_available() and torch.cuda.is_bf16_supported()
+        if bf16:
+            model.add_callback('on_train_start', _disable_grad_scaler)
+        # With DDP, Ultralytics re-creates the trainer in torch.distributed
+        # worker processes and these in-process callbacks do not carry over
+        checkpointer = AsyncCheckpointer()
+        model.add_callback('on_pretrain_routine_start', checkpointer.attach)
+        if torch.cuda.is_available():
+            model.add_callback('on_pretrain_routine_start', _use_fused_optimizer)
+            model.add_callback('on_train_start', _prefetch_to_device)
+            if self.use_gpu_hsv():
+                # Colour jitter moves to the GPU; geometric augmentation stays
+                # on the CPU workers, where labels and the mosaic crop are
+                # transformed together with the pixels
+                gains = (train_args['hsv_h'], train_args['hsv_s'], train_args['hsv_v'])
+                train_args.update(hsv_h=0.0, hsv_s=0.0, hsv_v=0.0)
+                model.add_callback('on_train_start', functools.partial(_gpu_hsv, gains=gains))
+            # NHWC only pays off with AMP; FP32 NHWC can be slower
+            if train_args['amp']:
+                model.add_callback('on_train_start', _channels_last)
+            # TORCH_COMPILE=0 opts out, e.g. when autotuning outweighs short runs
+            if hasattr(torch.nn.Module, 'compile') and os.environ.get('TORCH_COMPILE', '1') != '0':
+                model.add_callback('on_train_start', _compile_model)
+        
         # Print configuration
         print("\n⚙️  Training Configuration:")
         for key, value in train_args.items():
             if key not in ['data', 'project']:
                 print(f"  {key}: {value}")
+        print(f"  amp_dtype: {'bf16' if bf16 else 'fp16'}")
         print()
         
         # Start training
         start_time = time.time()
         
         try:
-            results = model.train(**train_args)
+            amp_context = torch.autocast(device_type='cuda', dtype=torch.bfloat16) if bf16 else nullcontext()
+            with amp_context:
+                results = model.train(**train_args)
             
             # Training complete
             duration = time.time() - start_time
@@ -191,17 +689,19 @@ class ThorDentalTrainer:
             'device': str(self.device),
             'config': self.thor_config[self.model_size],
             'timestamp': datetime.now().isoformat(),
-            'results_dir': str(results.save_dir),
+            'results_dir': Path(results.save_dir),
         }
         
         summary_file = Path(results.save_dir) / 'training_summary.json'
-        with open(summary_file, 'w') as f:
-            json.dump(summary, f, indent=2)
+        _write_json(summary_file, summary)
             
         print(f"\n💾 Summary saved: {summary_file}")
         
     def validate(self, model_path=None):
         """Validate trained model"""
+        import torch
+        from ultralytics import YOLO
+        
         print("\n🔍 Validating Model...")
         
         if model_path is None:
@@ -213,7 +713,14 @@ class ThorDentalTrainer:
             return None
             
         model = YOLO(model_path)
-        metrics = model.val()
+        # Training cached decoded val images as .npy (cache='disk'), so
+        # validation reuses them instead of decoding every JPEG again
+        # FP16 inference halves memory traffic for the predictions that feed
+        # NMS and the IoU matching; mAP50 typically moves by less than 1e-4.
+        # Metric reductions stay in FP32.
+        half = torch.cuda.is_available()
+        device = str(self.device).split(',')[0]
+        metrics = model.val(cache='disk', half=half, device=device)
         
         print("\n📊 Validation Results:")
         print(f"  mAP50: {metrics.box.map50:.3f}")
@@ -231,9 +738,59 @@ class ThorDentalTrainer:
             
         return metrics
         
-    def export_tensorrt(self, model_path=None):
+    def build_calibration_set(self, max_images=500, calib_dir='calib'):
+        """Link a class-stratified subset of the val images for INT8 calibration"""
+        import yaml
+        
+        dataset_path = Path('dataset')
+        label_dir = dataset_path / 'val' / 'labels'
+        
+        # Group val images by their most frequent class
+        by_class = {}
+        for image in sorted((dataset_path / 'val' / 'images').glob('*.jpg')):
+            label = label_dir / f'{image.stem}.txt'
+            classes = label.read_text().split('\n') if label.exists() else []
+            classes = [line.split()[0] for line in classes if line.strip()]
+            key = max(set(classes), key=classes.count) if classes else None
+            by_class.setdefault(key, []).append(image)
+            
+        # Round-robin across classes so rare ones are represented
+        chosen = []
+        queues = list(by_class.values())
+        while queues and len(chosen) < max_images:
+            for queue in queues:
+                if queue and len(chosen) < max_images:
+                    chosen.append(queue.pop(0))
+            queues = [queue for queue in queues if queue]
+            
+        calib_path = Path(calib_dir).resolve()
+        for sub in ('images', 'labels'):
+            (calib_path / sub).mkdir(parents=True, exist_ok=True)
+        for image in chosen:
+            links = [(image, calib_path / 'images' / image.name)]
+            label = label_dir / f'{image.stem}.txt'
+            if label.exists():
+                links.append((label, calib_path / 'labels' / label.name))
+            for src, dst in links:
+                if not dst.exists():
+                    dst.symlink_to(src.resolve())
+                    
+        with open(dataset_path / 'data.yaml') as f:
+            data = yaml.safe_load(f)
+        data.update({'path': str(calib_path), 'train': 'images', 'val': 'images'})
+        data_yaml = calib_path / 'data.yaml'
+        with open(data_yaml, 'w') as f:
+            yaml.safe_dump(data, f)
+            
+        print(f"✅ Calibration images: {len(chosen)}")
+        return str(data_yaml)
+        
+    def export_tensorrt(self, model_path=None, int8=False, batch=8, int8_backbone=False, dla=None):
         """Export model to TensorRT for maximum inference speed"""
-        print("\n🚀 Exporting to TensorRT...")
+        from ultralytics import YOLO
+        
+        precision = 'INT8 backbone + FP16 head' if int8_backbone else 'INT8' if int8 else 'FP16'
+        print(f"\n🚀 Exporting to TensorRT ({precision})...")
         
         if model_path is None:
             model_path = self.find_latest_model()
@@ -244,20 +801,62 @@ class ThorDentalTrainer:
             
         model = YOLO(model_path)
         
+        if int8_backbone:
+            # Per-layer precision needs the TensorRT builder directly
+            data_yaml = self.build_calibration_set()
+            calib_images = sorted((Path(data_yaml).parent / 'images').glob('*.jpg'))
+            imgsz = model.overrides.get('imgsz', self.thor_config[self.model_size]['imgsz'])
+            onnx_path = model.export(format='onnx', imgsz=imgsz, dynamic=True, batch=batch)
+            engine_path = build_mixed_engine(onnx_path, Path(onnx_path).with_suffix('.engine'),
+                                             calib_images, imgsz, batch=batch)
+            print(f"✅ TensorRT engine: {engine_path}")
+            return engine_path
+            
+        export_args = {
+            'format': 'engine',
+            'device': str(self.device).split(',')[0],
+            'half': True,  # FP16 for speed
+            'workspace': 4,  # 4GB workspace
+            'verbose': True,
+        }
+        
+        if int8:
+            # TensorRT's entropy calibrator runs over the calibration split;
+            # Ultralytics caches the result next to the engine so re-exports
+            # skip calibration
+            export_args.update({
+                'int8': True,
+                'data': self.build_calibration_set(),
+                'batch': batch,
+            })
+            
         # Export to TensorRT
-        engine_path = model.export(
-            format='engine',
-            device=self.device,
-            half=True,  # FP16 for speed
-            workspace=4,  # 4GB workspace
-            verbose=True
-        )
+        engine_path = model.export(**export_args)
         
+        if dla is not None:
+            # A second engine for a DLA core (unsupported layers fall back
+            # to the GPU), so serving can round-robin frames across both.
+            # Ultralytics always writes <model>.engine, so rename each one.
+            gpu_engine = Path(engine_path).with_name(f'{Path(model_path).stem}_gpu.engine')
+            os.replace(engine_path, gpu_engine)
+            dla_engine = Path(model.export(**{**export_args, 'device': f'dla:{dla}'}))
+            engine_path = dla_engine.with_name(f'{Path(model_path).stem}_dla{dla}.engine')
+            os.replace(dla_engine, engine_path)
+            self.record_engines(model_path, {'gpu': str(gpu_engine), f'dla{dla}': str(engine_path)})
+            print(f"✅ TensorRT engine (GPU): {gpu_engine}")
+            
         print(f"✅ TensorRT engine: {engine_path}")
         print("💡 Use this for production inference (3-5x faster!)")
         
         return engine_path
         
+    def record_engines(self, model_path, engines):
+        """Add exported engine paths to the run's training summary"""
+        summary_file = Path(model_path).parent.parent / 'training_summary.json'
+        summary = json.loads(summary_file.read_text()) if summary_file.exists() else {}
+        summary.setdefault('engines', {}).update(engines)
+        _write_json(summary_file, summary)
+        
     def find_latest_model(self):
         """Find the most recent trained model"""
         runs_dir = Path('runs/detect')
@@ -265,15 +864,22 @@ class ThorDentalTrainer:
         if not runs_dir.exists():
             return None
             
-        # Find all weight files
-        weight_files = list(runs_dir.glob('**/weights/best.pt'))
-        
-        if not weight_files:
-            return None
-            
-        # Return most recent
-        latest = max(weight_files, key=lambda p: p.stat().st_mtime)
-        return str(latest)
+        # Runs live directly under runs/detect, so only <run>/weights/best.pt
+        # needs checking; one stat per run gives both existence and mtime
+        latest, latest_mtime = None, -1.0
+        with os.scandir(runs_dir) as runs:
+            for run in runs:
+                if not run.is_dir():
+                    continue
+                candidate = os.path.join(run.path, 'weights', 'best.pt')
+                try:
+                    mtime = os.stat(candidate).st_mtime
+                except FileNotFoundError:
+                    continue
+                if mtime > latest_mtime:
+                    latest, latest_mtime = candidate, mtime
+                    
+        return latest
 
 
 def main():
@@ -294,14 +900,29 @@ Examples:
   # Train large model (best accuracy)
   python3 train_thor.py --model l
   
+  # Train on two GPUs with DDP
+  python3 train_thor.py --devices 0,1
+  
   # Resume training
   python3 train_thor.py --resume
   
+  # Resume a specific run
+  python3 train_thor.py --resume --run-name dental_thor_m_20250101_0900
+  
   # Validate model
   python3 train_thor.py --validate
   
   # Export to TensorRT
   python3 train_thor.py --export
+  
+  # Export to INT8 TensorRT (calibrated on dataset/val)
+  python3 train_thor.py --export --int8
+  
+  # Export with an INT8 backbone and FP16 head
+  python3 train_thor.py --export --int8-backbone
+  
+  # Export GPU and DLA core 0 engines for parallel serving
+  python3 train_thor.py --export --dla 0
         """
     )
     
@@ -320,6 +941,18 @@ Examples:
         help='Project name for this training run'
     )
     
+    parser.add_argument(
+        '--run-name',
+        type=str,
+        help='Run directory name under runs/detect (default: <project>_<model>_<timestamp>)'
+    )
+    
+    parser.add_argument(
+        '--devices',
+        type=str,
+        help='CUDA devices for training, e.g. 0,1 for multi-GPU DDP'
+    )
+    
     parser.add_argument(
         '--resume',
         action='store_true',
@@ -338,6 +971,25 @@ Examples:
         help='Export model to TensorRT'
     )
     
+    parser.add_argument(
+        '--int8',
+        action='store_true',
+        help='Export an INT8 engine calibrated on validation images'
+    )
+    
+    parser.add_argument(
+        '--int8-backbone',
+        action='store_true',
+        help='Export an INT8 backbone with the neck and head kept in FP16'
+    )
+    
+    parser.add_argument(
+        '--dla',
+        type=int,
+        choices=[0, 1],
+        help='Also export an engine for this DLA core, alongside the GPU engine'
+    )
+    
     parser.add_argument(
         '--model-path',
         type=str,
@@ -349,13 +1001,16 @@ Examples:
     # Create trainer
     trainer = ThorDentalTrainer(
         model_size=args.model,
-        project_name=args.project
+        project_name=args.project,
+        devices=args.devices,
+        run_name=args.run_name
     )
     
     print("🦷 Dentescope-AI Training on Jetson Thor")
     print("="*60)
     print(f"Model: YOLOv8{args.model}")
     print(f"Project: {args.project}")
+    print(f"Device: {trainer.device}")
     print("="*60)
     
     # Execute requested action
@@ -363,7 +1018,8 @@ Examples:
         trainer.validate(args.model_path)
         
     elif args.export:
-        trainer.export_tensorrt(args.model_path)
+        trainer.export_tensorrt(args.model_path, int8=args.int8, int8_backbone=args.int8_backbone,
+                                 dla=args.dla)
         
     else:
         # Train model
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Numba kernel for the per-contour scoring in classify_all_teeth.
+
+Imported by config_parameters only when numba is installed; the NumPy
+implementation there is used otherwise.
+"""
+
+from numba import njit
+
+# Order of the thresholds in the ``params`` array, named as in
+# config_parameters._POS
+PARAM_NAMES = (
+    'posterior_start',
+    'posterior_end',
+    'middle_start',
+    'middle_end',
+    'molar_v_min',
+    'molar_v_max',
+    'premolar_v_min',
+    'premolar_v_max',
+    'compactness_threshold',
+)
+
+POSTERIOR_START, POSTERIOR_END, MIDDLE_START, MIDDLE_END = 0, 1, 2, 3
+MOLAR_V_MIN, MOLAR_V_MAX, PREMOLAR_V_MIN, PREMOLAR_V_MAX = 4, 5, 6, 7
+COMPACTNESS_THRESHOLD = 8
+
+# No fastmath: reassociating the additions would change the score sums
+# and with them the tie-breaks between classes
+@njit(cache=True)
+def score_teeth(rel_x, rel_y, area_pct, aspect, compactness, scores, params):
+    """
+    Fill ``scores[:, 0]`` (primary molar) and ``scores[:, 1]`` (premolar).
+    
+    Args:
+        rel_x, rel_y: (N,) centroid position relative to the image size
+        area_pct: (N,) area percentile among all contours
+        aspect: (N,) bounding box width / height
+        compactness: (N,) 4*pi*area/perimeter**2, 0 for a zero perimeter
+        scores: (N, 3) zero-initialised output
+        params: Thresholds in PARAM_NAMES order
+    """
+    for i in range(rel_x.shape[0]):
+        x = rel_x[i]
+        y = rel_y[i]
+        molar = 0.0
+        premolar = 0.0
+        
+        # Position-based scoring
+        if params[POSTERIOR_START] <= x <= params[POSTERIOR_END]:
+            molar += 0.5
+            if x > 0.7:
+                molar += 0.2
+        
+        if params[MIDDLE_START] <= x <= params[MIDDLE_END]:
+            premolar += 0.4
+            if 0.45 <= x <= 0.65:
+                premolar += 0.2
+        
+        # Vertical position scoring
+        if params[MOLAR_V_MIN] <= y <= params[MOLAR_V_MAX]:
+            molar += 0.2
+        if params[PREMOLAR_V_MIN] <= y <= params[PREMOLAR_V_MAX]:
+            premolar += 0.2
+        
+        # Size-based scoring
+        if area_pct[i] > 0.65:
+            molar += 0.4
+        elif area_pct[i] > 0.35:
+            premolar += 0.3
+            molar += 0.1
+        else:
+            premolar += 0.2
+        
+        # Shape-based scoring
+        if compactness[i] > params[COMPACTNESS_THRESHOLD]:
+            molar += 0.15
+            premolar += 0.1
+        
+        # Aspect ratio scoring
+        if 0.6 <= aspect[i] <= 1.6:
+            molar += 0.15
+        elif 0.8 <= aspect[i] <= 2.2:
+            premolar += 0.15
+        
+        scores[i, 0] = molar
+        scores[i, 1] = premolar
@@ -4,13 +4,25 @@
 """
 Configuration parameters for dental width predictor.
 
-This module contains adjustable parameters for different aspects of the
-detection and measurement pipeline. Users can modify these parameters
-to improve results for their specific dataset.
+This module contains the parameters for different aspects of the
+detection and measurement pipeline. The configs are read-only once
+defined: get_config hands out frozen views that can be shared without
+copying. To tune them for a specific dataset, edit the values here, use
+create_custom_config / load_config_from_file for variants, or start from
+thaw_config for an editable copy.
 """
 
-import cv2
-import numpy as np
+import copyreg
+import functools
+import json
+import os
+import types
+
+# cv2 and numpy are imported inside the analysis functions so that reading
+# or saving a configuration does not pay for loading OpenCV
+
+# cv2.FONT_HERSHEY_SIMPLEX, inlined to keep this module free of cv2
+FONT_HERSHEY_SIMPLEX = 0
 
 # Detection Parameters
 DETECTION_CONFIG = {
@@ -110,6 +122,49 @@ CLASSIFICATION_CONFIG = {
     }
 }
 
+class _Thresholds:
+    """Read-only record of thresholds stored in slots"""
+    __slots__ = ()
+    
+    def __init__(self, **values):
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+class _PositionThresholds(_Thresholds):
+    __slots__ = ('posterior_start', 'posterior_end', 'middle_start', 'middle_end',
+                 'molar_v_min', 'molar_v_max', 'premolar_v_min', 'premolar_v_max',
+                 'compactness_threshold')
+
+class _AnatomyThresholds(_Thresholds):
+    __slots__ = ('molar_premolar_proximity', 'molar_premolar_proximity_sq',
+                 'horizontal_overlap_max', 'enforce_size_relationship',
+                 'size_difference_threshold')
+
+# Flat views of the classification thresholds read by the classification
+# and pairing code: one slot load instead of nested dict probes
+_POS = _PositionThresholds(
+    posterior_start=CLASSIFICATION_CONFIG["position_weights"]["posterior_region_start"],
+    posterior_end=CLASSIFICATION_CONFIG["position_weights"]["posterior_region_end"],
+    middle_start=CLASSIFICATION_CONFIG["position_weights"]["middle_region_start"],
+    middle_end=CLASSIFICATION_CONFIG["position_weights"]["middle_region_end"],
+    molar_v_min=CLASSIFICATION_CONFIG["position_weights"]["primary_molar_vertical_range"][0],
+    molar_v_max=CLASSIFICATION_CONFIG["position_weights"]["primary_molar_vertical_range"][1],
+    premolar_v_min=CLASSIFICATION_CONFIG["position_weights"]["premolar_vertical_range"][0],
+    premolar_v_max=CLASSIFICATION_CONFIG["position_weights"]["premolar_vertical_range"][1],
+    compactness_threshold=CLASSIFICATION_CONFIG["shape_features"]["compactness_threshold"],
+)
+
+_ANAT = _AnatomyThresholds(
+    molar_premolar_proximity=CLASSIFICATION_CONFIG["anatomical_constraints"]["molar_premolar_proximity"],
+    molar_premolar_proximity_sq=CLASSIFICATION_CONFIG["anatomical_constraints"]["molar_premolar_proximity"] ** 2,
+    horizontal_overlap_max=CLASSIFICATION_CONFIG["anatomical_constraints"]["horizontal_overlap_max"],
+    enforce_size_relationship=CLASSIFICATION_CONFIG["anatomical_constraints"]["enforce_size_relationship"],
+    size_difference_threshold=CLASSIFICATION_CONFIG["anatomical_constraints"]["size_difference_threshold"],
+)
+
 # Measurement Parameters
 MEASUREMENT_CONFIG = {
     # Contact point detection
@@ -195,7 +250,7 @@ DEBUG_CONFIG = {
     },
     
     # Text settings
-    "font": cv2.FONT_HERSHEY_SIMPLEX,
+    "font": FONT_HERSHEY_SIMPLEX,
     "font_scale": 0.5,
     "font_thickness": 1,
     "text_color": (255, 255, 255)
@@ -249,107 +304,302 @@ QUALITY_CONFIG = {
     }
 }
 
-def classify_tooth_type(contour, position, image_shape, all_contours):
+def _freeze(value):
+    """Read-only copy of a nested config: dicts become mappingproxies, lists tuples"""
+    if isinstance(value, dict):
+        return types.MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _mappingproxy(mapping):
+    """Rebuild a frozen mapping; the copyreg constructor for mappingproxies"""
+    return types.MappingProxyType(mapping)
+
+# copy.deepcopy and pickle cannot handle mappingproxies on their own; with
+# this they copy a frozen config as another frozen config
+copyreg.pickle(types.MappingProxyType, lambda proxy: (_mappingproxy, (dict(proxy),)))
+
+def thaw_config(config):
+    """Editable copy of a frozen config: mappings become dicts, sequences lists.
+    
+    Frozen configs are shared, so callers that want to modify one start
+    from this.
+    
+    Args:
+        config: Config from get_config, create_custom_config or
+            load_config_from_file
+        
+    Returns:
+        dict: Independent, fully mutable copy
+    """
+    if isinstance(config, (dict, types.MappingProxyType)):
+        return {key: thaw_config(value) for key, value in config.items()}
+    if isinstance(config, (list, tuple)):
+        return [thaw_config(value) for value in config]
+    return config
+
+# The configs are read-only from here on, so every consumer can share them
+# and create_custom_config only copies the branches it adjusts
+DETECTION_CONFIG = _freeze(DETECTION_CONFIG)
+CLASSIFICATION_CONFIG = _freeze(CLASSIFICATION_CONFIG)
+MEASUREMENT_CONFIG = _freeze(MEASUREMENT_CONFIG)
+PREPROCESSING_CONFIG = _freeze(PREPROCESSING_CONFIG)
+DEBUG_CONFIG = _freeze(DEBUG_CONFIG)
+BATCH_CONFIG = _freeze(BATCH_CONFIG)
+QUALITY_CONFIG = _freeze(QUALITY_CONFIG)
+
+def _area_ranks(areas):
+    """Area percentile per contour: 1-based rank / N, ties sharing the lowest rank"""
+    import numpy as np
+    
+    n = len(areas)
+    if n <= 1:
+        return np.full(n, 0.5)
+    return (np.searchsorted(np.sort(areas), areas, side='left') + 1) / n
+
+def compute_area_ranks(all_contours):
+    """
+    Area percentile of every contour among all detected contours.
+    
+    Args:
+        all_contours: List of all detected tooth contours
+        
+    Returns:
+        np.ndarray: (N,) percentiles in (0, 1], 0.5 for a single contour
+    """
+    import cv2
+    import numpy as np
+    
+    areas = np.fromiter((cv2.contourArea(c) for c in all_contours), dtype=np.float64, count=len(all_contours))
+    return _area_ranks(areas)
+
+def classify_tooth_type(contour, position, image_shape, area_percentile):
     """
     Improved tooth classification using anatomical constraints.
     
+    Scores one contour with the same rules as classify_all_teeth, which is
+    faster when classifying many.
+    
     Args:
         contour: Individual tooth contour
         position: (x, y) centroid position  
         image_shape: (height, width) of the image
-        all_contours: List of all detected tooth contours
+        area_percentile: Area rank of this contour among all detected
+            contours, from compute_area_ranks
         
     Returns:
         str: 'primary_molar', 'premolar', or 'other'
     """
-    
-    # Calculate relative position in image
-    rel_x = position[0] / image_shape[1]  # Horizontal position (0=left, 1=right)
-    rel_y = position[1] / image_shape[0]  # Vertical position (0=top, 1=bottom)
+    import cv2
+    import numpy as np
     
     # Calculate contour properties
     area = cv2.contourArea(contour)
     perimeter = cv2.arcLength(contour, True)
-    
-    # Bounding rectangle for aspect ratio
     x, y, w, h = cv2.boundingRect(contour)
-    aspect_ratio = float(w) / h
+    compactness = 4 * np.pi * area / (perimeter * perimeter) if perimeter > 0 else 0.0
+    
+    label = _label_teeth(
+        np.array([position[0] / image_shape[1]]),
+        np.array([position[1] / image_shape[0]]),
+        np.array([area_percentile], dtype=np.float64),
+        np.array([w / h]),
+        np.array([compactness]),
+    )[0]
+    return TOOTH_TYPES[label]
+
+def _score_teeth(rel_x, rel_y, area_pct, aspect, compactness, scores):
+    """NumPy fallback for _classify_kernel.score_teeth"""
+    import numpy as np
     
-    # Calculate area percentile among all contours
-    all_areas = [cv2.contourArea(c) for c in all_contours]
-    if len(all_areas) > 1:
-        area_percentile = (sorted(all_areas).index(area) + 1) / len(all_areas)
-    else:
-        area_percentile = 0.5
+    # Rules are applied in the same order as the numba kernel so the sums,
+    # and with them the tie-breaks, match it exactly
+    molar, premolar = scores[:, 0], scores[:, 1]
     
-    # Classification scores
-    scores = {
-        'primary_molar': 0.0,
-        'premolar': 0.0,
-        'other': 0.0
-    }
+    # Position-based scoring
+    posterior = (rel_x >= _POS.posterior_start) & (rel_x <= _POS.posterior_end)
+    molar += np.where(posterior, 0.5, 0.0)
+    molar += np.where(posterior & (rel_x > 0.7), 0.2, 0.0)
     
-    config = CLASSIFICATION_CONFIG
+    middle = (rel_x >= _POS.middle_start) & (rel_x <= _POS.middle_end)
+    premolar += np.where(middle, 0.4, 0.0)
+    premolar += np.where(middle & (rel_x >= 0.45) & (rel_x <= 0.65), 0.2, 0.0)
     
-    # Position-based scoring (IMPROVED)
-    posterior_start = config["position_weights"]["posterior_region_start"]
-    posterior_end = config["position_weights"]["posterior_region_end"]
-    middle_start = config["position_weights"]["middle_region_start"]
-    middle_end = config["position_weights"]["middle_region_end"]
+    # Vertical position scoring
+    molar += np.where((rel_y >= _POS.molar_v_min) & (rel_y <= _POS.molar_v_max), 0.2, 0.0)
+    premolar += np.where((rel_y >= _POS.premolar_v_min) & (rel_y <= _POS.premolar_v_max), 0.2, 0.0)
     
-    # Primary molar scoring (should be in posterior region)
-    if posterior_start <= rel_x <= posterior_end:
-        scores['primary_molar'] += 0.5  # Increased weight
-        # Additional bonus for being more posterior
-        if rel_x > 0.7:
-            scores['primary_molar'] += 0.2
+    # Size-based scoring
+    large = area_pct > 0.65
+    medium = ~large & (area_pct > 0.35)
+    molar += np.where(large, 0.4, 0.0)
+    premolar += np.where(medium, 0.3, np.where(large, 0.0, 0.2))
+    molar += np.where(medium, 0.1, 0.0)
     
-    # Premolar scoring (should be in middle region, beneath molars)
-    if middle_start <= rel_x <= middle_end:
-        scores['premolar'] += 0.4
-        # Bonus for being in the central posterior region
-        if 0.45 <= rel_x <= 0.65:
-            scores['premolar'] += 0.2
+    # Shape-based scoring
+    compact = compactness > _POS.compactness_threshold
+    molar += np.where(compact, 0.15, 0.0)
+    premolar += np.where(compact, 0.1, 0.0)
     
-    # Vertical position scoring
-    molar_v_min, molar_v_max = config["position_weights"]["primary_molar_vertical_range"]
-    premolar_v_min, premolar_v_max = config["position_weights"]["premolar_vertical_range"]
+    # Aspect ratio scoring
+    square = (aspect >= 0.6) & (aspect <= 1.6)
+    molar += np.where(square, 0.15, 0.0)
+    premolar += np.where(~square & (aspect >= 0.8) & (aspect <= 2.2), 0.15, 0.0)
+
+@functools.lru_cache(maxsize=None)
+def _score_kernel():
+    """Compiled scoring function and its threshold array, or None without numba"""
+    try:
+        from _classify_kernel import PARAM_NAMES, score_teeth
+    except ImportError:
+        return None
+    import numpy as np
+    
+    # One contiguous, read-only block of thresholds. Kept in float64:
+    # float32 would move the region boundaries (float32(0.7) < 0.7) and
+    # change labels for contours sitting on them
+    params = np.array([getattr(_POS, name) for name in PARAM_NAMES], dtype=np.float64)
+    params.flags.writeable = False
+    return score_teeth, params
+
+def _contour_moments(contours):
+    """
+    Area and first-order moments of integer contours in one pass.
     
-    if molar_v_min <= rel_y <= molar_v_max:
-        scores['primary_molar'] += 0.2
+    Evaluates the same shoelace sums as cv2.contourArea and cv2.moments
+    over all contour points at once, in exact int64 arithmetic and scaled
+    with the same constants, so the results are bit-identical.
     
-    if premolar_v_min <= rel_y <= premolar_v_max:
-        scores['premolar'] += 0.2
+    Returns:
+        tuple: (N,) areas and (N, 3) m00, m10, m01
+    """
+    import numpy as np
+    
+    lengths = np.fromiter((len(c) for c in contours), dtype=np.intp, count=len(contours))
+    starts = np.cumsum(lengths) - lengths
+    points = np.concatenate(contours).reshape(-1, 2).astype(np.int64)
+    
+    # Each point paired with its predecessor, wrapping within its contour
+    prev = np.arange(-1, len(points) - 1)
+    prev[starts] = starts + lengths - 1
+    x, y = points[:, 0], points[:, 1]
+    x_prev, y_prev = x[prev], y[prev]
+    
+    cross = x_prev * y - x * y_prev
+    sums = np.stack([
+        np.add.reduceat(cross, starts),
+        np.add.reduceat(cross * (x_prev + x), starts),
+        np.add.reduceat(cross * (y_prev + y), starts),
+    ], axis=1).astype(np.float64)
+    
+    # cv2.moments orients every contour positively and zeroes degenerate ones
+    sign = np.where(sums[:, 0] < 0, -1.0, 1.0)
+    moments = sums * np.stack([sign * 0.5, sign * (1 / 6), sign * (1 / 6)], axis=1)
+    moments[sums[:, 0] == 0] = 0.0
+    return np.abs(sums[:, 0] * 0.5), moments
+
+# Label order of the score columns used by classify_all_teeth
+TOOTH_TYPES = ('primary_molar', 'premolar', 'other')
+
+def _label_teeth(rel_x, rel_y, area_pct, aspect, compactness):
+    """Index into TOOTH_TYPES per contour, from (N,) float64 features"""
+    import numpy as np
+    
+    # Score columns follow TOOTH_TYPES ('other' stays 0)
+    scores = np.zeros((len(rel_x), 3))
+    kernel = _score_kernel()
+    if kernel is not None:
+        score_teeth, params = kernel
+        score_teeth(rel_x, rel_y, area_pct, aspect, compactness, scores, params)
+    else:
+        _score_teeth(rel_x, rel_y, area_pct, aspect, compactness, scores)
+    
+    # Highest score wins, unless no class is confident enough
+    labels = scores.argmax(axis=1)
+    labels[scores.max(axis=1) < 0.4] = 2
+    return labels
+
+def classify_all_teeth(contours, image_shape):
+    """
+    Classify every contour at once using anatomical constraints.
     
-    # Size-based scoring (IMPROVED)
-    if area_percentile > 0.65:  # Large tooth
-        scores['primary_molar'] += 0.4
-    elif area_percentile > 0.35:  # Medium tooth
-        scores['premolar'] += 0.3
-        scores['primary_molar'] += 0.1
-    else:  # Small tooth
-        scores['premolar'] += 0.2
+    Contour geometry is measured once and each scoring rule is evaluated as
+    a boolean mask over all contours, instead of re-measuring every contour
+    for each one classified.
     
-    # Shape-based scoring
-    if perimeter > 0:
-        compactness = 4 * np.pi * area / (perimeter * perimeter)
+    Args:
+        contours: List of detected tooth contours
+        image_shape: (height, width) of the image
         
-        if compactness > config["shape_features"]["compactness_threshold"]:
-            scores['primary_molar'] += 0.15
-            scores['premolar'] += 0.1
+    Returns:
+        np.ndarray: (N,) labels, 'primary_molar', 'premolar' or 'other'
+    """
+    import cv2
+    import numpy as np
     
-    # Aspect ratio scoring
-    if 0.6 <= aspect_ratio <= 1.6:  # More square-like (molars)
-        scores['primary_molar'] += 0.15
-    elif 0.8 <= aspect_ratio <= 2.2:  # Slightly elongated (premolars)
-        scores['premolar'] += 0.15
+    n = len(contours)
+    if n == 0:
+        return np.array(TOOTH_TYPES)[:0]
+    
+    # Contour geometry, measured once per contour
+    areas, moments = _contour_moments(contours)
+    perimeters = np.fromiter((cv2.arcLength(c, True) for c in contours), dtype=np.float64, count=n)
+    bboxes = np.array([cv2.boundingRect(c) for c in contours], dtype=np.int32).reshape(n, 4)
+    
+    # Integer centroids as the caller computes them; degenerate contours
+    # have no centroid and are labelled 'other'
+    has_centroid = moments[:, 0] != 0
+    m00 = np.where(has_centroid, moments[:, 0], 1.0)
+    rel_x = np.trunc(moments[:, 1] / m00) / image_shape[1]
+    rel_y = np.trunc(moments[:, 2] / m00) / image_shape[0]
+    aspect_ratio = bboxes[:, 2] / bboxes[:, 3]
+    
+    area_percentile = _area_ranks(areas)
     
-    # Return classification with highest score
-    max_score = max(scores.values())
-    if max_score < 0.4:  # Increased confidence threshold
-        return 'other'
+    with np.errstate(divide='ignore', invalid='ignore'):
+        compactness = np.where(perimeters > 0, 4 * np.pi * areas / (perimeters * perimeters), 0.0)
     
-    return max(scores, key=scores.get)
+    labels = _label_teeth(rel_x, rel_y, area_percentile, aspect_ratio, compactness)
+    labels[~has_centroid] = 2
+    
+    return np.array(TOOTH_TYPES)[labels]
+
+# A pair farther apart than molar_premolar_proximity cannot meet both the
+# horizontal and the vertical rule, so it scores at most 0.6 and can never
+# be accepted, as long as the thresholds keep that geometry
+_PROXIMITY_PRUNES = (_ANAT.molar_premolar_proximity_sq
+                     >= _ANAT.horizontal_overlap_max ** 2 + 80 ** 2)
+
+# Below this many premolars a KD-tree costs more to build than it saves
+_KDTREE_MIN_PREMOLARS = 8
+
+def _pair_scores(dx, dy, molar_area, premolar_area):
+    """Anatomical score of molar/premolar pairs, for any broadcastable arrays"""
+    import numpy as np
+    
+    # Same order as the scalar rules so the sums (and therefore ties) are
+    # unchanged
+    
+    # Distance constraint, compared squared to skip the sqrt
+    score = np.where(dx*dx + dy*dy < _ANAT.molar_premolar_proximity_sq, 0.3, 0.0)
+    
+    # Horizontal alignment (should be reasonably close horizontally)
+    score += np.where(np.abs(dx) < _ANAT.horizontal_overlap_max, 0.2, 0.0)
+    
+    # Vertical relationship: premolar below molar, or at a similar level
+    score += np.where((dy > 0) & (dy < 80), 0.3, np.where((dy > -20) & (dy < 20), 0.2, 0.0))
+    
+    # Size relationship (molar should be larger)
+    if _ANAT.enforce_size_relationship:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            size_ratio = np.where(premolar_area > 0, molar_area / premolar_area, 0.0)
+        score += np.where(size_ratio > (1 + _ANAT.size_difference_threshold), 0.2, 0.0)
+    
+    # Position relationship (molar should be more posterior)
+    score += np.where(dx > 0, 0.1, 0.0)
+    
+    return score
 
 def validate_tooth_pairs(detected_teeth):
     """
@@ -361,179 +611,288 @@ def validate_tooth_pairs(detected_teeth):
     Returns:
         dict: Validated and corrected tooth classifications
     """
+    import numpy as np
     
-    primary_molars = [t for t in detected_teeth if t['type'] == 'primary_molar']
-    premolars = [t for t in detected_teeth if t['type'] == 'premolar']
+    # Group by type in a single pass
+    groups = {'primary_molar': [], 'premolar': []}
+    for tooth in detected_teeth:
+        group = groups.get(tooth['type'])
+        if group is not None:
+            group.append(tooth)
+    primary_molars, premolars = groups['primary_molar'], groups['premolar']
     
     validated_pairs = []
-    config = CLASSIFICATION_CONFIG["anatomical_constraints"]
+    if not primary_molars or not premolars:
+        return validated_pairs
     
-    for molar in primary_molars:
-        # Find closest premolar that meets anatomical constraints
-        best_premolar = None
-        best_score = 0
+    molar_pos = np.array([m['position'] for m in primary_molars], dtype=np.float64)
+    premolar_pos = np.array([p['position'] for p in premolars], dtype=np.float64)
+    molar_area = np.array([m['area'] for m in primary_molars], dtype=np.float64)
+    premolar_area = np.array([p['area'] for p in premolars], dtype=np.float64)
+    
+    if _PROXIMITY_PRUNES and len(premolars) >= _KDTREE_MIN_PREMOLARS:
+        from scipy.spatial import cKDTree
+        
+        # Score only the premolars within reach of each molar; the rest
+        # keep -inf and are never the best match
+        neighbours = cKDTree(premolar_pos).query_ball_point(molar_pos, r=_ANAT.molar_premolar_proximity)
+        rows = np.repeat(np.arange(len(primary_molars)), [len(idx) for idx in neighbours])
+        cols = np.fromiter((j for idx in neighbours for j in idx), dtype=np.intp, count=len(rows))
         
-        for premolar in premolars:
-            # Calculate distance and relationship
-            dx = molar['position'][0] - premolar['position'][0]
-            dy = molar['position'][1] - premolar['position'][1]
-            distance = np.sqrt(dx*dx + dy*dy)
-            
-            # Anatomical constraint scoring
-            score = 0
-            
-            # Distance constraint
-            if distance < config["molar_premolar_proximity"]:
-                score += 0.3
-            
-            # Horizontal alignment (should be reasonably close horizontally)
-            if abs(dx) < config["horizontal_overlap_max"]:
-                score += 0.2
-            
-            # Vertical relationship (premolar should be below molar in mixed dentition)
-            if 0 < dy < 80:  # Premolar below molar
-                score += 0.3
-            elif -20 < dy < 20:  # Similar level (also acceptable)
-                score += 0.2
-            
-            # Size relationship (molar should be larger)
-            if config["enforce_size_relationship"]:
-                size_ratio = molar['area'] / premolar['area'] if premolar['area'] > 0 else 0
-                if size_ratio > (1 + config["size_difference_threshold"]):
-                    score += 0.2
-            
-            # Position relationship (molar should be more posterior)
-            if molar['position'][0] > premolar['position'][0]:
-                score += 0.1
-            
-            if score > best_score and score > 0.6:  # Minimum threshold
-                best_score = score
-                best_premolar = premolar
+        score = np.full((len(primary_molars), len(premolars)), -np.inf)
+        score[rows, cols] = _pair_scores(
+            molar_pos[rows, 0] - premolar_pos[cols, 0],
+            molar_pos[rows, 1] - premolar_pos[cols, 1],
+            molar_area[rows],
+            premolar_area[cols]
+        )
+    else:
+        # Every molar/premolar combination at once as (M, P) arrays
+        score = _pair_scores(
+            molar_pos[:, 0:1] - premolar_pos[None, :, 0],
+            molar_pos[:, 1:2] - premolar_pos[None, :, 1],
+            molar_area[:, None],
+            premolar_area[None, :]
+        )
+    
+    # First best-scoring premolar per molar, if it clears the minimum threshold
+    best_premolar = score.argmax(axis=1)
+    best_score = score.max(axis=1)
+    
+    for i in np.flatnonzero(best_score > 0.6):
+        molar = primary_molars[i]
+        premolar = premolars[best_premolar[i]]
+        anatomical_score = float(best_score[i])
+        pair_confidence = min(
+            molar.get('confidence', 0.8), 
+            premolar.get('confidence', 0.8),
+            anatomical_score
+        )
         
-        if best_premolar:
-            pair_confidence = min(
-                molar.get('confidence', 0.8), 
-                best_premolar.get('confidence', 0.8),
-                best_score
-            )
-            
-            validated_pairs.append({
-                'primary_molar': molar,
-                'premolar': best_premolar,
-                'confidence': pair_confidence,
-                'anatomical_score': best_score
-            })
+        validated_pairs.append({
+            'primary_molar': molar,
+            'premolar': premolar,
+            'confidence': pair_confidence,
+            'anatomical_score': anatomical_score
+        })
     
     return validated_pairs
 
+# Configurations by name, for get_config
+_CONFIGS = types.MappingProxyType({
+    "detection": DETECTION_CONFIG,
+    "classification": CLASSIFICATION_CONFIG,
+    "measurement": MEASUREMENT_CONFIG,
+    "preprocessing": PREPROCESSING_CONFIG,
+    "debug": DEBUG_CONFIG,
+    "batch": BATCH_CONFIG,
+    "quality": QUALITY_CONFIG
+})
+_EMPTY = types.MappingProxyType({})
+
+def _flatten(config, prefix, flat):
+    """Collect every leaf of a frozen config under its dotted path"""
+    for key, value in config.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, types.MappingProxyType):
+            _flatten(value, path, flat)
+        else:
+            flat[path] = value
+    return flat
+
+# Every parameter by dotted path, e.g. "detection.contour_filtering.min_area"
+_FLAT = types.MappingProxyType(_flatten(_CONFIGS, "", {}))
+
+def get_param(path):
+    """Get a single parameter by dotted path with one lookup.
+    
+    Args:
+        path (str): Dotted path, e.g. "measurement.contact_points.alignment_threshold"
+        
+    Returns:
+        The parameter value
+    """
+    return _FLAT[path]
+
+@functools.lru_cache(maxsize=None)
 def get_config(config_name):
     """Get a specific configuration dictionary.
     
+    Every call returns the same shared, read-only object; use thaw_config
+    for a copy that can be modified.
+    
     Args:
         config_name (str): Name of the configuration
         
     Returns:
-        dict: Configuration parameters
+        MappingProxyType: Configuration parameters (read-only)
     """
-    configs = {
-        "detection": DETECTION_CONFIG,
-        "classification": CLASSIFICATION_CONFIG,
-        "measurement": MEASUREMENT_CONFIG,
-        "preprocessing": PREPROCESSING_CONFIG,
-        "debug": DEBUG_CONFIG,
-        "batch": BATCH_CONFIG,
-        "quality": QUALITY_CONFIG
+    return _CONFIGS.get(config_name, _EMPTY)
+
+def _override(config, path, value):
+    """Frozen config with the value at ``path`` replaced, sharing all other branches"""
+    key, *rest = path
+    updated = dict(config)
+    updated[key] = _override(config[key], rest, value) if rest else _freeze(value)
+    return types.MappingProxyType(updated)
+
+# The configs create_custom_config starts from
+_BASE_CONFIG = types.MappingProxyType({
+    "detection": DETECTION_CONFIG,
+    "classification": CLASSIFICATION_CONFIG,
+    "measurement": MEASUREMENT_CONFIG,
+    "preprocessing": PREPROCESSING_CONFIG
+})
+
+def _overlays(table):
+    """Overlays by name as ((key, ...), value) pairs, paths split once"""
+    return types.MappingProxyType({
+        name: tuple((tuple(path.split(".")), _freeze(value)) for path, value in overlay.items())
+        for name, overlay in table.items()
+    })
+
+def _apply_overlay(config, overlay):
+    """Frozen config with every value of ``overlay`` set"""
+    for path, value in overlay:
+        config = _override(config, path, value)
+    return config
+
+# Adjustments applied by create_custom_config, by image type and by
+# quality setting, as dotted paths into the base configuration
+_IMAGE_TYPE_OVERLAYS = _overlays({
+    "panoramic": {
+        "measurement.calibration.default_factor": 0.1,
+        "detection.contour_filtering.min_area": 150
+    },
+    "intraoral": {
+        "measurement.calibration.default_factor": 0.05,
+        "detection.contour_filtering.min_area": 300
+    },
+    "cbct": {
+        "measurement.calibration.default_factor": 0.2,
+        "detection.contour_filtering.min_area": 100
     }
-    
-    return configs.get(config_name, {})
+})
 
+_QUALITY_OVERLAYS = _overlays({
+    "fast": {
+        "detection.edge_detection.sigma_values": [2.0, 3.0],
+        "preprocessing.clahe.clip_limit": 2.5
+    },
+    "high_quality": {
+        "detection.edge_detection.sigma_values": [1.0, 1.5, 2.0, 2.5, 3.0],
+        "preprocessing.clahe.clip_limit": 4.0
+    }
+})
+
+@functools.lru_cache(maxsize=16)
 def create_custom_config(image_type="panoramic", quality="standard"):
     """Create a custom configuration based on image type and quality requirements.
     
+    Results are cached per (image_type, quality) and returned read-only;
+    only the branches holding an adjusted value are copied, the rest are
+    shared with the base configuration.
+    
     Args:
         image_type (str): Type of image ("panoramic", "intraoral", "cbct")
         quality (str): Quality setting ("fast", "standard", "high_quality")
         
     Returns:
-        dict: Custom configuration parameters
+        MappingProxyType: Custom configuration parameters
     """
-    base_config = {
-        "detection": DETECTION_CONFIG.copy(),
-        "classification": CLASSIFICATION_CONFIG.copy(),
-        "measurement": MEASUREMENT_CONFIG.copy(),
-        "preprocessing": PREPROCESSING_CONFIG.copy()
-    }
-    
-    # Adjust for image type
-    if image_type == "panoramic":
-        base_config["measurement"]["calibration"]["default_factor"] = 0.1
-        base_config["detection"]["contour_filtering"]["min_area"] = 150
-    elif image_type == "intraoral":
-        base_config["measurement"]["calibration"]["default_factor"] = 0.05
-        base_config["detection"]["contour_filtering"]["min_area"] = 300
-    elif image_type == "cbct":
-        base_config["measurement"]["calibration"]["default_factor"] = 0.2
-        base_config["detection"]["contour_filtering"]["min_area"] = 100
-    
-    # Adjust for quality setting
-    if quality == "fast":
-        base_config["detection"]["edge_detection"]["sigma_values"] = [2.0, 3.0]
-        base_config["preprocessing"]["clahe"]["clip_limit"] = 2.5
-    elif quality == "high_quality":
-        base_config["detection"]["edge_detection"]["sigma_values"] = [1.0, 1.5, 2.0, 2.5, 3.0]
-        base_config["preprocessing"]["clahe"]["clip_limit"] = 4.0
-    
-    return base_config
+    config = _apply_overlay(_BASE_CONFIG, _IMAGE_TYPE_OVERLAYS.get(image_type, ()))
+    return _apply_overlay(config, _QUALITY_OVERLAYS.get(quality, ()))
+
+def _json_default(value):
+    """Serialize frozen configs as plain JSON objects, anything else as str"""
+    if isinstance(value, types.MappingProxyType):
+        return dict(value)
+    return str(value)
+
+@functools.lru_cache(maxsize=None)
+def _orjson():
+    """orjson if it is installed, imported on first use (it costs more than
+    building every config in this module)"""
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
 
 def save_config_to_file(config, filepath):
     """Save configuration to a JSON file.
     
+    The file is left untouched when it already holds the same JSON.
+    
     Args:
         config (dict): Configuration to save
         filepath (str): Path to save the configuration
     """
-    import json
-    
-    with open(filepath, 'w') as f:
-        json.dump(config, f, indent=2, default=str)
+    orjson = _orjson()
+    if orjson is not None:
+        payload = orjson.dumps(config, default=_json_default,
+                               option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        payload = json.dumps(config, indent=2, default=_json_default).encode('utf-8')
+    try:
+        with open(filepath, 'rb') as f:
+            if f.read() == payload:
+                return
+    except FileNotFoundError:
+        pass
+    
+    with open(filepath, 'wb') as f:
+        f.write(payload)
+
+@functools.lru_cache(maxsize=32)
+def _load_config(filepath, mtime_ns, size):
+    """Parsed and frozen config file; the stat fields only key the cache"""
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    orjson = _orjson()
+    return _freeze(orjson.loads(data) if orjson is not None else json.loads(data))
 
 def load_config_from_file(filepath):
     """Load configuration from a JSON file.
     
+    Parsed files are cached until their modification time or size
+    changes, and returned read-only like create_custom_config.
+    
     Args:
         filepath (str): Path to the configuration file
         
     Returns:
-        dict: Loaded configuration
+        MappingProxyType: Loaded configuration
     """
-    import json
-    
-    with open(filepath, 'r') as f:
-        return json.load(f)
+    stat = os.stat(filepath)
+    return _load_config(os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size)
 
 # Example usage and configuration templates
 if __name__ == "__main__":
-    print("Dental Width Predictor Configuration Parameters - UPDATED")
-    print("=" * 60)
+    # Collected and printed in one write
+    lines = [
+        "Dental Width Predictor Configuration Parameters - UPDATED",
+        "=" * 60
+    ]
     
     # Show available configurations
-    configs = ["detection", "classification", "measurement", "preprocessing", "debug", "batch", "quality"]
-    
-    for config_name in configs:
-        config = get_config(config_name)
-        print(f"\n{config_name.upper()} PARAMETERS:")
-        print(f"  Available parameters: {len(config)}")
+    for config_name, config in _CONFIGS.items():
+        lines.append(f"\n{config_name.upper()} PARAMETERS:")
+        lines.append(f"  Available parameters: {len(config)}")
         
         # Show key improvements
         if config_name == "classification":
-            print(f"  - Posterior region: {config['position_weights']['posterior_region_start']}-{config['position_weights']['posterior_region_end']}")
-            print(f"  - Anatomical constraints: {len(config['anatomical_constraints'])} rules")
+            lines.append(f"  - Posterior region: {config['position_weights']['posterior_region_start']}-{config['position_weights']['posterior_region_end']}")
+            lines.append(f"  - Anatomical constraints: {len(config['anatomical_constraints'])} rules")
         elif config_name == "detection":
-            print(f"  - Min area: {config['contour_filtering']['min_area']}")
-            print(f"  - Max area: {config['contour_filtering']['max_area']}")
-    
-    print(f"\nKey improvements in this version:")
-    print("- Enhanced anatomical positioning constraints")
-    print("- Improved size-based classification")
-    print("- Better vertical relationship detection")
-    print("- More robust tooth pairing validation")
+            lines.append(f"  - Min area: {config['contour_filtering']['min_area']}")
+            lines.append(f"  - Max area: {config['contour_filtering']['max_area']}")
+    
+    lines += [
+        "\nKey improvements in this version:",
+        "- Enhanced anatomical positioning constraints",
+        "- Improved size-based classification",
+        "- Better vertical relationship detection",
+        "- More robust tooth pairing validation"
+    ]
+    print("\n".join(lines))
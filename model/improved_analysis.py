@@ -11,6 +11,7 @@ anatomical positions and characteristics.
 
 import cv2
 import numpy as np
+import threading
 import time
 from typing import List, Dict, Tuple, Optional
 from config_parameters import (
@@ -18,10 +19,44 @@ from config_parameters import (
     DETECTION_CONFIG, 
     PREPROCESSING_CONFIG,
     MEASUREMENT_CONFIG,
-    classify_tooth_type, 
+    classify_all_teeth,
     validate_tooth_pairs
 )
 
+# Sharpening kernel as the float32 array cv2.filter2D takes, built once
+# instead of converting the config's nested tuples on every image
+_SHARPEN_KERNEL = np.array(PREPROCESSING_CONFIG["sharpening"]["kernel"], dtype=np.float32)
+_SHARPEN_KERNEL.flags.writeable = False
+
+# CLAHE objects per parameter set, created on first use and reused for
+# every image; kept per thread because apply() works in internal buffers
+_clahe = threading.local()
+
+def get_clahe(kind: str = "default") -> cv2.CLAHE:
+    """
+    Shared CLAHE for the default settings or one of the adaptive_params sets.
+    
+    Args:
+        kind: "default", or a key of PREPROCESSING_CONFIG["clahe"]["adaptive_params"]
+        
+    Returns:
+        CLAHE object for the calling thread
+    """
+    instances = getattr(_clahe, 'instances', None)
+    if instances is None:
+        instances = _clahe.instances = {}
+    
+    clahe = instances.get(kind)
+    if clahe is None:
+        params = PREPROCESSING_CONFIG["clahe"]
+        if kind != "default":
+            params = params["adaptive_params"][kind]
+        clahe = instances[kind] = cv2.createCLAHE(
+            clipLimit=params["clip_limit"],
+            tileGridSize=params["tile_grid_size"]
+        )
+    return clahe
+
 def preprocess_dental_image(image: np.ndarray) -> np.ndarray:
     """
     Enhanced preprocessing for dental radiographs.
@@ -42,12 +77,7 @@ def preprocess_dental_image(image: np.ndarray) -> np.ndarray:
         gray = image.copy()
     
     # Apply CLAHE for enhanced contrast
-    clahe_params = config["clahe"]
-    clahe = cv2.createCLAHE(
-        clipLimit=clahe_params["clip_limit"],
-        tileGridSize=clahe_params["tile_grid_size"]
-    )
-    enhanced = clahe.apply(gray)
+    enhanced = get_clahe().apply(gray)
     
     # Histogram stretching
     hist_params = config["histogram"]
@@ -68,8 +98,7 @@ def preprocess_dental_image(image: np.ndarray) -> np.ndarray:
     
     # Optional sharpening
     if config["sharpening"]["enable"]:
-        kernel = np.array(config["sharpening"]["kernel"], dtype=np.float32)
-        sharpened = cv2.filter2D(filtered, -1, kernel)
+        sharpened = cv2.filter2D(filtered, -1, _SHARPEN_KERNEL)
         weight = config["sharpening"]["weight"]
         result = cv2.addWeighted(filtered, 1 - weight, sharpened, weight, 0)
     else:
@@ -152,10 +181,15 @@ def filter_tooth_contours(contours: List[np.ndarray], image_shape: Tuple[int, in
     arch_left = int(width * (1 - arch_config["arch_width_ratio"]) / 2)
     arch_right = int(width * (1 + arch_config["arch_width_ratio"]) / 2)
     
+    # Thresholds bound to locals once rather than looked up per contour
+    min_area, max_area = filter_config["min_area"], filter_config["max_area"]
+    min_solidity = filter_config["min_solidity"]
+    aspect_min, aspect_max = arch_config["aspect_ratio_min"], arch_config["aspect_ratio_max"]
+    
     for contour in contours:
         # Basic size filtering
         area = cv2.contourArea(contour)
-        if not (filter_config["min_area"] <= area <= filter_config["max_area"]):
+        if not (min_area <= area <= max_area):
             continue
         
         # Shape filtering
@@ -173,13 +207,13 @@ def filter_tooth_contours(contours: List[np.ndarray], image_shape: Tuple[int, in
         hull_area = cv2.contourArea(hull)
         if hull_area > 0:
             solidity = area / hull_area
-            if solidity < filter_config["min_solidity"]:
+            if solidity < min_solidity:
                 continue
         
         # Aspect ratio filtering
         x, y, w, h = cv2.boundingRect(contour)
         aspect_ratio = float(w) / h
-        if not (arch_config["aspect_ratio_min"] <= aspect_ratio <= arch_config["aspect_ratio_max"]):
+        if not (aspect_min <= aspect_ratio <= aspect_max):
             continue
         
         # Position filtering (must be in dental arch region)
@@ -335,17 +369,15 @@ def analyze_dental_radiograph(image_path: str, calibration_factor: Optional[floa
         # Classify and detect teeth
         detected_teeth = []
         image_shape = preprocessed.shape
+        tooth_types = classify_all_teeth(contours, image_shape)
         
-        for contour in contours:
+        for contour, tooth_type in zip(contours, tooth_types):
             # Calculate centroid
             M = cv2.moments(contour)
             if M['m00'] != 0:
                 cx = int(M['m10'] / M['m00'])
                 cy = int(M['m01'] / M['m00'])
                 
-                # Classify tooth type
-                tooth_type = classify_tooth_type(contour, (cx, cy), image_shape, contours)
-                
                 if tooth_type in ['primary_molar', 'premolar']:
                     confidence = calculate_confidence(contour, (cx, cy), image_shape)
                     
@@ -0,0 +1,65 @@
+"""
+Tests for the frozen configs in config_parameters.
+
+Run with: python test_config_parameters.py (or pytest) from the model directory.
+"""
+
+import copy
+import types
+import unittest
+
+from config_parameters import get_config, thaw_config
+
+
+class ThawConfigTest(unittest.TestCase):
+    def test_nested_sequence_entries_are_mutable(self):
+        batch = thaw_config(get_config('batch'))
+        batch['retry_parameter_variations'][0]['method'] = 'yolo'
+        batch['retry_parameter_variations'].append({'method': 'traditional'})
+
+        detection = thaw_config(get_config('detection'))
+        detection['contour_filtering']['alternative_sets'][0]['min_area'] = 1
+
+        self.assertEqual(batch['retry_parameter_variations'][0]['method'], 'yolo')
+        self.assertEqual(len(batch['retry_parameter_variations']), 4)
+        self.assertEqual(detection['contour_filtering']['alternative_sets'][0]['min_area'], 1)
+
+    def test_shared_config_is_unchanged(self):
+        batch = thaw_config(get_config('batch'))
+        batch['retry_parameter_variations'][0]['method'] = 'yolo'
+        detection = thaw_config(get_config('detection'))
+        detection['contour_filtering']['alternative_sets'][0]['min_area'] = 1
+
+        self.assertEqual(get_config('batch')['retry_parameter_variations'][0]['method'], 'traditional')
+        self.assertEqual(get_config('detection')['contour_filtering']['alternative_sets'][0]['min_area'], 100)
+
+    def test_thawed_config_is_plain_data(self):
+        thawed = thaw_config(get_config('preprocessing'))
+
+        def check(value):
+            if isinstance(value, dict):
+                for item in value.values():
+                    check(item)
+            elif isinstance(value, list):
+                for item in value:
+                    check(item)
+            else:
+                self.assertNotIsInstance(value, tuple)
+
+        self.assertIsInstance(thawed, dict)
+        check(thawed)
+
+
+class FrozenConfigTest(unittest.TestCase):
+    def test_deepcopy_gives_equal_frozen_config(self):
+        config = get_config('detection')
+        copied = copy.deepcopy(config)
+
+        self.assertEqual(copied, config)
+        self.assertIsNot(copied, config)
+        self.assertIsInstance(copied['contour_filtering'], types.MappingProxyType)
+        self.assertIsNot(copied['contour_filtering'], config['contour_filtering'])
+
+
+if __name__ == '__main__':
+    unittest.main()